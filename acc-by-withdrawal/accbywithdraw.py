@@ -1,4 +1,5 @@
 import os
+import sys
 import requests
 import csv
 import json
@@ -6,6 +7,9 @@ from collections import defaultdict
 from decimal import Decimal, getcontext
 from json import JSONEncoder
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import sp_api
+
 # Set the precision for Decimal operations
 getcontext().prec = 28  # Adjust as needed for your requirements
 
@@ -19,24 +23,19 @@ class CustomEncoder(JSONEncoder):
 results_dir = "./results"
 os.makedirs(results_dir, exist_ok=True)
 
-# Validator API endpoint
-validators_url = "https://sp-api.dappnode.io/memory/validators"
-# Fees info API endpoint
-feesinfo_url = "https://sp-api.dappnode.io//memory/feesinfo"
-
 # Conversion factor from wei to ether as a Decimal
 WEI_TO_ETH = Decimal('10') ** 18
 
-# Make requests to the two API endpoints
-validators_response = requests.get(validators_url)
-feesinfo_response = requests.get(feesinfo_url)
+# Make requests to the two API endpoints through the shared SP API client
+try:
+    validators_data = sp_api.validators()
+    feesinfo_data = sp_api.fees_info()
+    fetch_error = None
+except requests.RequestException as e:
+    fetch_error = e
 
 # Check if both requests were successful
-if validators_response.status_code == 200 and feesinfo_response.status_code == 200:
-    # Parse the JSON responses
-    validators_data = validators_response.json()
-    feesinfo_data = feesinfo_response.json()
-
+if fetch_error is None:
     # Dictionary to accumulate rewards for each withdrawal address (in wei)
     rewards_by_address = defaultdict(Decimal)
 
@@ -89,4 +88,4 @@ if validators_response.status_code == 200 and feesinfo_response.status_code == 2
 
     print(f"Results written to {csv_path}, {json_path}, and {txt_path}")
 else:
-    print(f"Failed to fetch data. Status codes: validators: {validators_response.status_code}, feesinfo: {feesinfo_response.status_code}")
+    print(f"Failed to fetch data: {fetch_error}")
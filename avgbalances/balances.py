@@ -1,15 +1,16 @@
-import requests
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import sp_api
 
 # Constants
-URL = "https://sp-api.dappnode.io/memory/validators"
 GWEI_IN_ETH = 1e9
 EFFECTIVE_BALANCE_THRESHOLD_GWEI = 32 * GWEI_IN_ETH
 OUTPUT_FILE = "results.txt"
 
 def fetch_validator_data():
-    response = requests.get(URL)
-    response.raise_for_status()
-    return response.json()
+    return sp_api.validators()
 
 def analyze_validators(validators):
     # Count how many have effective balance > 32 ETH
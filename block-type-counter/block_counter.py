@@ -1,17 +1,19 @@
+import os
+import sys
 import requests
 import csv
 
-# URL from which to fetch data
-url = "https://sp-api.dappnode.io/memory/proposedblocks"
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import sp_api
 
-# Sending a GET request to the URL
-response = requests.get(url)
+# Fetching proposed blocks through the shared SP API client
+try:
+    data = sp_api.proposed_blocks()
+except requests.RequestException:
+    data = None
 
 # Check if the request was successful
-if response.status_code == 200:
-    # Parsing the JSON data
-    data = response.json()
-
+if data is not None:
     # Counters for the reward types and list for vanilla entries
     mev_count = 0
     vanilla_entries = []
@@ -0,0 +1,13 @@
+"""Pooled requests.Session for scripts that call third-party APIs from
+several worker threads, so every worker reuses a keep-alive connection.
+"""
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def make_session(pool_size):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,42 @@
+"""Thread-safe token bucket for pacing requests to third-party APIs.
+
+Tokens refill at `rate` per second up to `burst`. `acquire()` blocks until a
+token is available, so any number of worker threads can share one bucket and
+together stay under the rate.
+"""
+import threading
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, self.rate))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def set_rate(self, rate):
+        """Change the refill rate, e.g. to back off after a 429."""
+        with self.lock:
+            self._refill()
+            self.rate = float(rate)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Block until a token is available, then take it. A rate of 0 or
+        less disables the limit."""
+        while True:
+            with self.lock:
+                if self.rate <= 0:
+                    return
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,139 @@
+"""Shared HTTP client for the Smooth oracle API (sp-api.dappnode.io).
+
+Every script goes through one pooled requests.Session with timeouts, gzip and
+retries with backoff on 429/5xx. JSON GET responses are kept in a short-lived
+on-disk cache, so a batch of reports fetches /memory/validators only once.
+
+Settings can be overridden with environment variables:
+    SP_API_URL        base URL (default https://sp-api.dappnode.io)
+    SP_API_TIMEOUT    read timeout in seconds (default 120)
+    SP_API_CACHE_TTL  seconds a cached response is reused, 0 disables (default 600)
+    SP_API_CACHE_DIR  cache directory (default $XDG_CACHE_HOME/smooth-scripts,
+                      or ~/.cache/smooth-scripts)
+"""
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+SP_API_URL = os.getenv("SP_API_URL", "https://sp-api.dappnode.io").rstrip("/")
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = float(os.getenv("SP_API_TIMEOUT", "120"))
+CACHE_TTL = float(os.getenv("SP_API_CACHE_TTL", "600"))
+CACHE_DIR = os.getenv(
+    "SP_API_CACHE_DIR",
+    os.path.join(
+        os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+        "smooth-scripts",
+    ),
+)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_sessions = {}
+_cache_dir_ok = None  # set on first use by private_cache_dir
+
+
+def session(retry_statuses=RETRY_STATUSES):
+    """Return the process-wide pooled session, creating it on first use.
+
+    Callers that pace themselves can pass retry_statuses without 429 to get
+    throttled responses back instead of having them retried here. urllib3
+    retries any 429 with a Retry-After header, so such sessions ignore it."""
+    retry_statuses = tuple(retry_statuses)
+    if retry_statuses not in _sessions:
+        retry = Retry(
+            total=5,
+            backoff_factor=1,
+            status_forcelist=retry_statuses,
+            respect_retry_after_header=429 in retry_statuses,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry)
+        _sessions[retry_statuses] = requests.Session()
+        _sessions[retry_statuses].mount("https://", adapter)
+        _sessions[retry_statuses].mount("http://", adapter)
+        _sessions[retry_statuses].headers["Accept-Encoding"] = "gzip, deflate"
+    return _sessions[retry_statuses]
+
+
+def url_for(path):
+    """Accept either a full URL or a path on the SP API, e.g. /memory/validators."""
+    if path.startswith(("http://", "https://")):
+        return path
+    return f"{SP_API_URL}/{path.lstrip('/')}"
+
+
+def get(path, retry_statuses=RETRY_STATUSES, **kwargs):
+    """GET through the shared session. Raises requests.HTTPError on failure."""
+    kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+    response = session(retry_statuses).get(url_for(path), **kwargs)
+    response.raise_for_status()
+    return response
+
+
+def private_cache_dir():
+    """Create CACHE_DIR readable only by this user, and check that nobody else
+    can plant responses in it. Returns False if it cannot be trusted."""
+    global _cache_dir_ok
+    if _cache_dir_ok is None:
+        try:
+            os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+            info = os.stat(CACHE_DIR)
+            _cache_dir_ok = not hasattr(os, "getuid") or (
+                info.st_uid == os.getuid() and not info.st_mode & 0o022
+            )
+        except OSError:
+            _cache_dir_ok = False
+        if not _cache_dir_ok:
+            print(
+                f"Not using SP API cache {CACHE_DIR}: it cannot be created, "
+                "or another user owns it or can write to it",
+                file=sys.stderr,
+            )
+    return _cache_dir_ok
+
+
+def get_json(path, cache_ttl=CACHE_TTL):
+    """GET and decode JSON, reusing an on-disk copy younger than cache_ttl."""
+    url = url_for(path)
+    if cache_ttl <= 0 or not private_cache_dir():
+        return get(url).json()
+
+    cache_path = os.path.join(
+        CACHE_DIR, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json.gz"
+    )
+    try:
+        if time.time() - os.path.getmtime(cache_path) < cache_ttl:
+            with gzip.open(cache_path, "rb") as cache_file:
+                return json.loads(cache_file.read())
+    except (OSError, ValueError):
+        pass
+
+    response = get(url)
+    # response.json() raises a RequestException on a non-JSON body, which
+    # callers already handle
+    data = response.json()
+    content = response.content
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with gzip.open(temp_path, "wb", compresslevel=1) as cache_file:
+        cache_file.write(content)
+    os.replace(temp_path, cache_path)
+    return data
+
+
+def validators():
+    return get_json("/memory/validators")
+
+
+def proposed_blocks():
+    return get_json("/memory/proposedblocks")
+
+
+def fees_info():
+    return get_json("/memory/feesinfo")
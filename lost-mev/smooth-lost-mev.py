@@ -1,15 +1,24 @@
+import os
+import sys
+import heapq
 import requests
 import time
 import csv
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import argparse
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import sp_api
+from pooled_session import make_session
+from rate_limit import TokenBucket
+
+PAYLOAD_API_URL = os.getenv("PAYLOAD_API_URL", "https://api.payload.de")
+TOP_N = 10
+
 def get_blocks(track_all=False):
-    url = "https://sp-api.dappnode.io/memory/proposedblocks"
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        blocks = response.json()
+        blocks = sp_api.proposed_blocks()
         if track_all:
             return [block['block'] for block in blocks]
         else:
@@ -18,10 +27,11 @@ def get_blocks(track_all=False):
         print(f"Failed to fetch data: {e}")
         return []
 
-def get_block_difference(block_number):
-    url = f"https://api.payload.de/block_info?block={block_number}"
+def get_block_difference(session, bucket, block_number):
+    url = f"{PAYLOAD_API_URL}/block_info?block={block_number}"
     try:
-        response = requests.get(url)
+        bucket.acquire()
+        response = session.get(url, timeout=30)
         response.raise_for_status()
         block_info = response.json()
         return float(block_info['difference'])
@@ -29,10 +39,22 @@ def get_block_difference(block_number):
         print(f"Failed to fetch block {block_number}: {e}")
         return None
 
-def write_to_csv(block_number, difference, timestamp):
-    with open('results.csv', 'a', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([timestamp, block_number, difference])
+def load_recorded_differences():
+    # Differences already saved in results.csv, by block number. Later rows
+    # win if a block was recorded more than once.
+    recorded = {}
+    try:
+        with open('results.csv', newline='') as file:
+            reader = csv.reader(file)
+            next(reader, None)
+            for row in reader:
+                try:
+                    recorded[int(row[1])] = float(row[2])
+                except (IndexError, ValueError):
+                    continue
+    except FileNotFoundError:
+        pass
+    return recorded
 
 def write_summary_to_file(total_difference, top_differences):
     with open('stats_summary.txt', 'w') as file:
@@ -41,7 +63,7 @@ def write_summary_to_file(total_difference, top_differences):
         for diff, block in top_differences:
             file.write(f"Block {block}: {diff}\n")
 
-def main(track_all):
+def main(track_all, concurrency, rate):
     # Check if the file exists, if not create and write the header
     try:
         with open('results.csv', 'x', newline='') as file:
@@ -50,22 +72,38 @@ def main(track_all):
     except FileExistsError:
         pass
 
-    blocks = get_blocks(track_all)
-    total_difference = 0.0
-    differences = []
+    blocks = list(dict.fromkeys(get_blocks(track_all)))
+    recorded = load_recorded_differences()
+    new_blocks = [block for block in blocks if block not in recorded]
+    print(f"{len(blocks) - len(new_blocks)} blocks already in results.csv, fetching {len(new_blocks)} new blocks")
 
+    session = make_session(concurrency)
+    bucket = TokenBucket(rate)
+    started = time.monotonic()
+    with open('results.csv', 'a', newline='') as file, \
+            ThreadPoolExecutor(max_workers=concurrency) as executor:
+        writer = csv.writer(file)
+        differences = executor.map(lambda block: get_block_difference(session, bucket, block), new_blocks)
+        for block, difference in zip(new_blocks, differences):
+            if difference is not None:
+                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                writer.writerow([timestamp, block, difference])
+                recorded[block] = difference
+    print(f"Checked {len(new_blocks)} blocks in {time.monotonic() - started:.1f}s")
+
+    # Summarize the blocks tracked in this mode, whether fetched now or before
+    total_difference = 0.0
+    top_differences = []  # min-heap of the TOP_N largest (difference, block)
     for block in blocks:
-        difference = get_block_difference(block)
-        if difference is not None:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            write_to_csv(block, difference, timestamp)
+        if block in recorded:
+            difference = recorded[block]
             total_difference += difference
-            differences.append((difference, block))
-        time.sleep(1)  # Adjust rate limiting as necessary
+            if len(top_differences) < TOP_N:
+                heapq.heappush(top_differences, (difference, block))
+            else:
+                heapq.heappushpop(top_differences, (difference, block))
 
-    # Sorting to find top 10 differences
-    differences.sort(reverse=True, key=lambda x: x[0])
-    top_differences = differences[:10]
+    top_differences = sorted(top_differences, reverse=True, key=lambda x: x[0])
 
     # Write summary stats to file
     write_summary_to_file(total_difference, top_differences)
@@ -79,5 +117,9 @@ def main(track_all):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Track Ethereum block differences.')
     parser.add_argument('--track-all', action='store_true', help='Track all blocks instead of only those with reward_type == "vanila"')
+    parser.add_argument('--concurrency', type=int, default=8, help='Number of payload.de requests in flight (default 8)')
+    parser.add_argument('--rate', type=float, default=5, help='Maximum payload.de requests per second, 0 for no limit (default 5)')
     args = parser.parse_args()
-    main(args.track_all)
+    if args.concurrency < 1:
+        parser.error('--concurrency must be at least 1')
+    main(args.track_all, args.concurrency, args.rate)
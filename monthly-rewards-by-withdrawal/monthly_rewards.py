@@ -1,17 +1,56 @@
 #!/usr/bin/env python3
 import argparse
+import contextlib
 import csv
+import gzip
+import io
 import json
+import mmap
+import os
+import re
+import shutil
+import sqlite3
+import struct
 import sys
+import tempfile
 import urllib.error
 import urllib.request
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
 
+try:
+    import numpy as np
+except ImportError:  # only needed for --engine numpy
+    np = None
 
 MAINNET_GENESIS_UNIX = 1606824023
 DEFAULT_API_URL = "https://sp-api.dappnode.io/"
 SECONDS_PER_SLOT = 12
 WEI_PER_ETH = 10**18
+STREAM_CHUNK_SIZE = 1 << 20
+CACHE_SCHEMA_VERSION = "1"
+AGGREGATION_ENGINES = ("python", "numpy")
+WEI_LIMB_DIGITS = 9
+WEI_LIMB_BASE = 10**WEI_LIMB_DIGITS
+
+# Binary snapshot layout: header, per-address records grouped by checkpoint,
+# then the address table and the checkpoint table. Wei amounts are signed
+# 128-bit integers stored as (low, high) 64-bit halves.
+SNAPSHOT_MAGIC = b"SMOOTHS1"
+SNAPSHOT_HEADER = struct.Struct("<8sQQQQ")
+SNAPSHOT_RECORD = struct.Struct("<IIQqQq")
+SNAPSHOT_CHECKPOINT = struct.Struct("<qQQ")
+SNAPSHOT_ADDRESS_LENGTH = struct.Struct("<I")
+
+STATE_CONTAINER_KEYS = ("state", "State", "data", "Data")
+COMMITTED_STATES_KEYS = ("commited_states", "committed_states")
+
+JSON_STRUCTURE = re.compile(r'["\[\]{}]')
+JSON_STRING_END = re.compile(r'["\\]')
+JSON_SCALAR_END = re.compile(r"[\s,\]}]")
+JSON_WHITESPACE = re.compile(r"\s*")
+JSON_NUMBER_CHARS = "0123456789+-.eE"
 
 OUTPUT_COLUMNS = [
     "month",
@@ -56,11 +95,26 @@ def parse_args():
         "--state-file",
         help="Path to a previously saved /state JSON response",
     )
+    source.add_argument(
+        "--snapshot-file",
+        help="Path to a binary snapshot written by --write-snapshot",
+    )
     parser.add_argument(
         "--withdrawal-address",
+        action="append",
+        default=[],
+        help=(
+            "Withdrawal address to match, case-insensitive. Repeat to report "
+            "several addresses in one pass. If omitted, output one monthly "
+            "series per withdrawal address."
+        ),
+    )
+    parser.add_argument(
+        "--withdrawal-addresses-file",
         help=(
-            "Withdrawal address to match, case-insensitive. "
-            "If omitted, output one monthly series per withdrawal address."
+            "File with one withdrawal address per line to report together "
+            "with any --withdrawal-address values. Blank lines and lines "
+            "starting with # are ignored."
         ),
     )
     parser.add_argument(
@@ -75,35 +129,456 @@ def parse_args():
         default=120,
         help="HTTP timeout in seconds when using --api-url",
     )
+    parser.add_argument(
+        "--http-cache-dir",
+        help=(
+            "Directory keeping the last /state download when using --api-url. "
+            "The cached copy is revalidated with ETag/If-Modified-Since and "
+            "reused when the oracle answers 304 Not Modified."
+        ),
+    )
     parser.add_argument(
         "--format",
-        choices=("table", "csv", "json"),
+        choices=("table", "csv", "json", "jsonl"),
         default="table",
-        help="Output format",
+        help="Output format. jsonl writes one JSON object per line.",
     )
     parser.add_argument(
         "--output",
         help="Write output to this file instead of stdout",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help=(
+            "Parse /state incrementally, one checkpoint at a time, instead of "
+            "loading the whole response into memory"
+        ),
+    )
+    parser.add_argument(
+        "--cache-file",
+        help=(
+            "SQLite file holding monthly snapshots from previous runs. Only "
+            "checkpoints newer than the last cached slot are aggregated."
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help=(
+            "Number of processes decoding and aggregating checkpoints in "
+            "parallel. Requires --stream. Defaults to 1 (no process pool)."
+        ),
+    )
+    parser.add_argument(
+        "--engine",
+        choices=AGGREGATION_ENGINES,
+        default="python",
+        help=(
+            "Checkpoint aggregation engine. 'numpy' sums validators as integer "
+            "columns and produces the same wei totals."
+        ),
+    )
+    parser.add_argument(
+        "--write-snapshot",
+        metavar="PATH",
+        help=(
+            "Convert the /state input into a binary snapshot at PATH and exit. "
+            "Read it back later with --snapshot-file."
+        ),
+    )
     parser.add_argument(
         "--include-zero-months",
         action="store_true",
         help=(
-            "In single-address mode, include months whose last checkpoint has "
-            "zero matching validators"
+            "When filtering by address, include months whose last checkpoint "
+            "has zero matching validators for that address"
         ),
     )
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1 and not args.stream:
+        parser.error("--workers needs --stream")
+    if args.engine == "numpy" and np is None:
+        parser.error("--engine numpy requires numpy: pip install numpy")
+    if args.snapshot_file and (args.stream or args.cache_file or args.write_snapshot):
+        parser.error(
+            "--snapshot-file cannot be combined with --stream, --cache-file "
+            "or --write-snapshot"
+        )
+    if args.write_snapshot and args.cache_file:
+        parser.error("--write-snapshot cannot be combined with --cache-file")
+    if args.withdrawal_addresses_file:
+        try:
+            args.withdrawal_address.extend(
+                read_addresses_file(args.withdrawal_addresses_file)
+            )
+        except OSError as exc:
+            parser.error(f"Could not read --withdrawal-addresses-file: {exc}")
+        if not args.withdrawal_address:
+            parser.error("--withdrawal-addresses-file contains no addresses")
+    return args
+
+
+def read_addresses_file(path):
+    with open(path, "r", encoding="utf-8") as addresses_file:
+        return [
+            line.strip()
+            for line in addresses_file
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
 
 
 def load_state(args):
-    if args.state_file:
-        with open(args.state_file, "r", encoding="utf-8") as state_file:
+    state_path = state_file_path(args)
+    if state_path:
+        with open(state_path, "r", encoding="utf-8") as state_file:
             return json.load(state_file)
 
+    with open_state_response(args) as response:
+        return json.loads(decoded_body(response).read().decode("utf-8"))
+
+
+@contextlib.contextmanager
+def open_state_stream(args):
+    state_path = state_file_path(args)
+    if state_path:
+        with open(state_path, "r", encoding="utf-8") as state_file:
+            yield state_file
+        return
+
+    with open_state_response(args) as response:
+        yield io.TextIOWrapper(decoded_body(response), encoding="utf-8")
+
+
+def state_file_path(args):
+    if args.state_file:
+        return args.state_file
+    if args.http_cache_dir:
+        return fetch_state_cached(args)
+    return None
+
+
+def open_state_response(args, headers=None):
     api_url = args.api_url.rstrip("/")
-    with urllib.request.urlopen(f"{api_url}/state", timeout=args.timeout) as response:
-        return json.loads(response.read().decode("utf-8"))
+    request = urllib.request.Request(
+        f"{api_url}/state",
+        headers={"Accept-Encoding": "gzip", **(headers or {})},
+    )
+    return urllib.request.urlopen(request, timeout=args.timeout)
+
+
+def decoded_body(response):
+    if response.headers.get("Content-Encoding", "").lower() == "gzip":
+        return gzip.GzipFile(fileobj=response, mode="rb")
+    return response
+
+
+def fetch_state_cached(args):
+    """Return the path of an up-to-date copy of /state in the HTTP cache.
+
+    The body is streamed to disk, so it is never held in memory, and the
+    cached copy is replaced atomically once the download completes.
+    """
+    os.makedirs(args.http_cache_dir, exist_ok=True)
+    body_path = os.path.join(args.http_cache_dir, "state.json")
+    meta_path = os.path.join(args.http_cache_dir, "state.meta.json")
+    url = f"{args.api_url.rstrip('/')}/state"
+
+    meta = {}
+    if os.path.exists(body_path) and os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as meta_file:
+            meta = json.load(meta_file)
+        if meta.get("url") != url:
+            meta = {}
+
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        response = open_state_response(args, headers)
+    except urllib.error.HTTPError as exc:
+        if exc.code == 304 and headers:
+            exc.close()
+            return body_path
+        raise
+
+    with response:
+        body_file = tempfile.NamedTemporaryFile(
+            dir=args.http_cache_dir, suffix=".part", delete=False
+        )
+        try:
+            with body_file:
+                shutil.copyfileobj(decoded_body(response), body_file)
+            if os.path.exists(meta_path):
+                os.unlink(meta_path)
+            os.replace(body_file.name, body_path)
+        except BaseException:
+            if os.path.exists(body_file.name):
+                os.unlink(body_file.name)
+            raise
+        meta = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+
+    with open(meta_path, "w", encoding="utf-8") as meta_file:
+        json.dump(meta, meta_file)
+    return body_path
+
+
+class JsonStreamReader:
+    """Walk a JSON document from a text stream without decoding all of it.
+
+    Values are decoded one at a time with JSONDecoder.raw_decode, so only the
+    value being read (plus what was read past it) is held in memory. Skipped
+    values are scanned a chunk at a time and never held whole.
+    """
+
+    def __init__(self, stream, chunk_size=STREAM_CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+        # Size of the last value that needed more than one read, with some
+        # headroom; consecutive checkpoints are about the same size.
+        self.size_hint = 0
+
+    def _fill(self, size=None):
+        # Drop the consumed prefix while appending, so each read copies only
+        # the unread part of the buffer instead of everything read so far.
+        chunk = self.stream.read(size or self.chunk_size)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _fill_or_fail(self):
+        if not self._fill():
+            raise ValueError("Unexpected end of JSON stream")
+
+    def _skip_whitespace(self):
+        while True:
+            self.pos = JSON_WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self._fill():
+                return
+
+    def peek(self):
+        self._skip_whitespace()
+        if self.pos >= len(self.buffer):
+            raise ValueError("Unexpected end of JSON stream")
+        return self.buffer[self.pos]
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(
+                f"Expected {char!r} at stream offset {self.pos}, found {found!r}"
+            )
+        self.pos += 1
+
+    def read_value(self, with_text=False):
+        """Decode the next value; with_text also returns its JSON source."""
+        self._skip_whitespace()
+        # Read ahead to the size hint so a value like the last large one is
+        # usually decoded on the first attempt
+        buffered = len(self.buffer) - self.pos
+        if buffered < self.size_hint:
+            self._fill(self.size_hint - buffered)
+
+        refilled = False
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                error = None
+            except json.JSONDecodeError as exc:
+                end, error = None, exc
+
+            # Only numbers end in a digit, and a number is complete only if a
+            # character that cannot continue it follows in the buffer.
+            if end is not None and (
+                not self.buffer[end - 1].isdigit()
+                or (
+                    end < len(self.buffer)
+                    and self.buffer[end] not in JSON_NUMBER_CHARS
+                )
+            ):
+                break
+
+            # The value failed or may be cut short: read at least as much again
+            # as is buffered, so a large value is decoded a logarithmic number
+            # of times, and retry.
+            if not self._fill(max(self.chunk_size, len(self.buffer) - self.pos)):
+                if error is not None:
+                    raise error
+                break
+            refilled = True
+
+        if refilled:
+            self.size_hint = max(self.size_hint, (end - self.pos) * 9 // 8)
+        text = self.buffer[self.pos:end] if with_text else None
+        self.pos = end
+        return (value, text) if with_text else value
+
+    def skip_value(self):
+        first = self.peek()
+        if first not in '"[{':
+            while True:
+                match = JSON_SCALAR_END.search(self.buffer, self.pos)
+                if match is not None:
+                    self.pos = match.start()
+                    return
+                self.pos = len(self.buffer)
+                if not self._fill():
+                    return
+
+        depth = 0
+        in_string = False
+        while True:
+            pattern = JSON_STRING_END if in_string else JSON_STRUCTURE
+            match = pattern.search(self.buffer, self.pos)
+            if match is None:
+                self.pos = len(self.buffer)
+                self._fill_or_fail()
+                continue
+
+            char = match.group()
+            self.pos = match.end()
+            if in_string:
+                if char == "\\":
+                    # Step over the escaped character, which may be in the
+                    # next chunk
+                    if self.pos >= len(self.buffer):
+                        self._fill_or_fail()
+                    self.pos += 1
+                    continue
+                in_string = False
+                if depth == 0:
+                    return
+            elif char == '"':
+                in_string = True
+            elif char in "[{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def _next_separator(self, closing):
+        separator = self.peek()
+        self.pos += 1
+        if separator == closing:
+            return False
+        if separator != ",":
+            raise ValueError(
+                f"Expected ',' or {closing!r} at stream offset {self.pos - 1}"
+            )
+        return True
+
+    def iter_object(self):
+        """Yield each key; the caller must read or skip its value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise ValueError(f"Expected an object key, found {key!r}")
+            self.expect(":")
+            yield key
+            if not self._next_separator("}"):
+                return
+
+    def iter_array(self):
+        """Yield once per element; the caller must read or skip it."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+
+        while True:
+            yield
+            if not self._next_separator("]"):
+                return
+
+
+class EncodedCheckpoint(dict):
+    """A streamed checkpoint reduced to its slot, plus its JSON text.
+
+    Worker processes decode the text themselves: sending a string to another
+    process is a copy, while pickling a decoded checkpoint costs about as much
+    as aggregating it.
+    """
+
+    def __init__(self, slot, json_text):
+        super().__init__(slot=slot)
+        self.json_text = json_text
+
+
+def stream_committed_states(state_stream, keep_text=False):
+    """Yield normalized checkpoints from a /state stream one at a time.
+
+    With keep_text, checkpoints are yielded as EncodedCheckpoint.
+    """
+    reader = JsonStreamReader(state_stream)
+    if reader.peek() != "{":
+        raise KeyError("Could not find 'commited_states' in the /state response")
+
+    for key in reader.iter_object():
+        if key in COMMITTED_STATES_KEYS:
+            yield from stream_checkpoints(reader, keep_text)
+            return
+        if key in STATE_CONTAINER_KEYS and reader.peek() == "{":
+            for nested_key in reader.iter_object():
+                if nested_key in COMMITTED_STATES_KEYS:
+                    yield from stream_checkpoints(reader, keep_text)
+                    return
+                reader.skip_value()
+            continue
+        reader.skip_value()
+
+    raise KeyError("Could not find 'commited_states' in the /state response")
+
+
+def stream_checkpoints(reader, keep_text=False):
+    def read_checkpoint(slot_key=None):
+        if not keep_text:
+            checkpoint = reader.read_value()
+            if isinstance(checkpoint, dict) and slot_key is not None:
+                checkpoint.setdefault("slot", slot_key)
+            return checkpoint
+
+        checkpoint, text = reader.read_value(with_text=True)
+        if not isinstance(checkpoint, dict):
+            return None
+        return EncodedCheckpoint(checkpoint.get("slot", slot_key), text)
+
+    first = reader.peek()
+    if first == "[":
+        for _ in reader.iter_array():
+            checkpoint = read_checkpoint()
+            if isinstance(checkpoint, dict):
+                yield checkpoint
+        return
+
+    if first == "{":
+        for slot_key in reader.iter_object():
+            checkpoint = read_checkpoint(slot_key)
+            if isinstance(checkpoint, dict):
+                yield checkpoint
+        return
+
+    raise TypeError("'commited_states' must be a list or object")
 
 
 def extract_committed_states(payload):
@@ -179,34 +654,49 @@ def slot_to_month(slot, genesis_unix):
     return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m")
 
 
-def checkpoint_snapshot(checkpoint, requested_address):
-    validators = checkpoint.get("validators", {})
-    accumulated = 0
-    pending = 0
-    matched_validators = 0
+def empty_snapshot(withdrawal_address, slot):
+    return {
+        "withdrawal_address": withdrawal_address,
+        "slot": slot,
+        "matched_validators": 0,
+        "accumulated_rewards_wei": 0,
+        "pending_rewards_wei": 0,
+        "total_rewards_wei": 0,
+    }
+
+
+def checkpoint_snapshots_for_addresses(checkpoint, requested_addresses):
+    """Aggregate the requested addresses in one pass over the validators.
 
-    for validator in normalize_validators(validators):
+    Every requested address gets a snapshot, with zero totals when none of its
+    validators are in the checkpoint.
+    """
+    slot = parse_int(checkpoint.get("slot"), "slot")
+    snapshots = {
+        address: empty_snapshot(address, slot) for address in requested_addresses
+    }
+
+    for validator in normalize_validators(checkpoint.get("validators", {})):
         withdrawal_address = normalize_address(validator.get("withdrawal_address", ""))
-        if withdrawal_address != requested_address:
+        snapshot = snapshots.get(withdrawal_address)
+        if snapshot is None:
             continue
 
-        matched_validators += 1
-        accumulated += parse_int(
+        accumulated = parse_int(
             validator.get("accumulated_rewards_wei"),
             "accumulated_rewards_wei",
         )
-        pending += parse_int(
+        pending = parse_int(
             validator.get("pending_rewards_wei"),
             "pending_rewards_wei",
         )
 
-    return {
-        "slot": parse_int(checkpoint.get("slot"), "slot"),
-        "matched_validators": matched_validators,
-        "accumulated_rewards_wei": accumulated,
-        "pending_rewards_wei": pending,
-        "total_rewards_wei": accumulated + pending,
-    }
+        snapshot["matched_validators"] += 1
+        snapshot["accumulated_rewards_wei"] += accumulated
+        snapshot["pending_rewards_wei"] += pending
+        snapshot["total_rewards_wei"] += accumulated + pending
+
+    return list(snapshots.values())
 
 
 def checkpoint_snapshots_by_address(checkpoint):
@@ -218,17 +708,11 @@ def checkpoint_snapshots_by_address(checkpoint):
         if not withdrawal_address:
             continue
 
-        snapshot = snapshots.setdefault(
-            withdrawal_address,
-            {
-                "withdrawal_address": withdrawal_address,
-                "slot": slot,
-                "matched_validators": 0,
-                "accumulated_rewards_wei": 0,
-                "pending_rewards_wei": 0,
-                "total_rewards_wei": 0,
-            },
-        )
+        snapshot = snapshots.get(withdrawal_address)
+        if snapshot is None:
+            snapshot = snapshots[withdrawal_address] = empty_snapshot(
+                withdrawal_address, slot
+            )
         accumulated = parse_int(
             validator.get("accumulated_rewards_wei"),
             "accumulated_rewards_wei",
@@ -246,55 +730,625 @@ def checkpoint_snapshots_by_address(checkpoint):
     return snapshots.values()
 
 
-def monthly_snapshots(
-    committed_states,
-    requested_address,
-    genesis_unix,
-    include_zero_months,
-):
-    snapshots_by_month = {}
-    snapshots_by_address_month = {}
-
-    checkpoints = sorted(
-        normalize_committed_states(committed_states),
+def sort_checkpoints(checkpoints):
+    return sorted(
+        checkpoints,
         key=lambda checkpoint: parse_int(checkpoint.get("slot"), "slot"),
     )
 
+
+def last_checkpoint_per_month(checkpoints, genesis_unix):
+    """Yield (month, slot, checkpoint) for checkpoints that may end a month.
+
+    Checkpoints already superseded by a later slot of the same month are
+    dropped before any validator is read. Only one candidate is held back at a
+    time, so streams stay bounded; for slot-ordered input exactly one
+    checkpoint per month is yielded.
+    """
+    latest_slot_by_month = {}
+    pending = None
+
     for checkpoint in checkpoints:
         slot = parse_int(checkpoint.get("slot"), "slot")
         month = slot_to_month(slot, genesis_unix)
-
-        if requested_address:
-            snapshot = checkpoint_snapshot(checkpoint, requested_address)
-            snapshot["month"] = month
-            snapshots_by_month[month] = snapshot
+        if slot < latest_slot_by_month.get(month, slot):
             continue
 
-        for snapshot in checkpoint_snapshots_by_address(checkpoint):
-            snapshot["month"] = month
-            key = (snapshot["withdrawal_address"], month)
-            snapshots_by_address_month[key] = snapshot
+        latest_slot_by_month[month] = slot
+        if pending is not None and pending[0] != month:
+            yield pending
+        pending = (month, slot, checkpoint)
 
-    if not requested_address:
-        return [
-            snapshot
-            for _, snapshot in sorted(
-                snapshots_by_address_month.items(),
-                key=lambda item: (item[0][0], item[0][1]),
+    if pending is not None:
+        yield pending
+
+
+def checkpoints_after(checkpoints, after_slot):
+    for checkpoint in checkpoints:
+        if parse_int(checkpoint.get("slot"), "slot") > after_slot:
+            yield checkpoint
+
+
+def decimal_limbs(values):
+    """Split wei values into base 10**9 int64 limbs, most significant first.
+
+    Returns None unless every value is None or a plain run of digits, so the
+    caller can fall back to parse_int for signs, whitespace or bad input.
+    """
+    strings = np.array(
+        ["0" if value is None else value for value in values],
+        dtype=str,
+    )
+    if not strings.size:
+        return np.zeros((0, 1), dtype=np.int64)
+    if (np.char.str_len(strings) == 0).any():
+        return None
+
+    width = strings.dtype.itemsize // np.dtype("U1").itemsize
+    limb_count = -(-width // WEI_LIMB_DIGITS)
+    padded = np.char.zfill(strings, limb_count * WEI_LIMB_DIGITS).astype(
+        f"U{limb_count * WEI_LIMB_DIGITS}"
+    )
+    digits = padded.view(np.uint32).reshape(
+        len(strings), limb_count, WEI_LIMB_DIGITS
+    ).astype(np.int64) - ord("0")
+    if ((digits < 0) | (digits > 9)).any():
+        return None
+
+    powers = 10 ** np.arange(WEI_LIMB_DIGITS - 1, -1, -1, dtype=np.int64)
+    return digits @ powers
+
+
+def limbs_to_int(limbs):
+    total = 0
+    for limb in limbs:
+        total = total * WEI_LIMB_BASE + int(limb)
+    return total
+
+
+def columnar_checkpoint_snapshots(checkpoint):
+    """NumPy version of checkpoint_snapshots_by_address.
+
+    Raw addresses are factorized into integer codes, normalized once per
+    distinct value, and each wei limb column is summed per code with bincount.
+    Limbs are below 10**9, so the float64 sums stay exact while a checkpoint
+    has fewer than 2**53 / 10**9 validators. Returns None when the input needs
+    the Python path instead.
+    """
+    slot = parse_int(checkpoint.get("slot"), "slot")
+    validators = list(normalize_validators(checkpoint.get("validators", {})))
+    if len(validators) * WEI_LIMB_BASE >= 2**53:
+        return None
+
+    raw_index = {}
+    try:
+        raw_codes = np.array(
+            [
+                raw_index.setdefault(
+                    validator.get("withdrawal_address", ""), len(raw_index)
+                )
+                for validator in validators
+            ],
+            dtype=np.intp,
+        )
+    except TypeError:
+        return None
+    if any(type(raw_address) is not str for raw_address in raw_index):
+        return None
+
+    accumulated = decimal_limbs(
+        [validator.get("accumulated_rewards_wei") for validator in validators]
+    )
+    pending = decimal_limbs(
+        [validator.get("pending_rewards_wei") for validator in validators]
+    )
+    if accumulated is None or pending is None:
+        return None
+
+    address_index = {}
+    address_codes = []
+    for raw_address in raw_index:
+        address = normalize_address(raw_address)
+        address_codes.append(
+            address_index.setdefault(address, len(address_index)) if address else -1
+        )
+    codes = np.array(address_codes, dtype=np.intp)[raw_codes]
+    matched = codes >= 0
+    codes = codes[matched]
+    groups = len(address_index)
+    counts = np.bincount(codes, minlength=groups)
+
+    def grouped_sums(limbs):
+        limbs = limbs[matched]
+        return np.stack(
+            [
+                np.bincount(codes, weights=limbs[:, column], minlength=groups)
+                for column in range(limbs.shape[1])
+            ],
+            axis=1,
+        )
+
+    accumulated_sums = grouped_sums(accumulated)
+    pending_sums = grouped_sums(pending)
+
+    snapshots = []
+    for withdrawal_address, index in address_index.items():
+        accumulated_wei = limbs_to_int(accumulated_sums[index])
+        pending_wei = limbs_to_int(pending_sums[index])
+        snapshots.append(
+            {
+                "withdrawal_address": withdrawal_address,
+                "slot": slot,
+                "matched_validators": int(counts[index]),
+                "accumulated_rewards_wei": accumulated_wei,
+                "pending_rewards_wei": pending_wei,
+                "total_rewards_wei": accumulated_wei + pending_wei,
+            }
+        )
+    return snapshots
+
+
+def aggregate_checkpoint(checkpoint, requested_addresses, engine="python"):
+    # Requested addresses are filtered before parsing, so only the all-addresses
+    # mode benefits from a columnar pass.
+    if requested_addresses:
+        return checkpoint_snapshots_for_addresses(checkpoint, requested_addresses)
+
+    if engine == "numpy":
+        snapshots = columnar_checkpoint_snapshots(checkpoint)
+        if snapshots is not None:
+            return snapshots
+    return list(checkpoint_snapshots_by_address(checkpoint))
+
+
+def aggregate_encoded_checkpoint(json_text, slot, requested_addresses, engine):
+    checkpoint = json.loads(json_text)
+    checkpoint.setdefault("slot", slot)
+    return aggregate_checkpoint(checkpoint, requested_addresses, engine)
+
+
+def aggregate_checkpoints(candidates, requested_addresses, workers, engine):
+    """Yield (month, slot, snapshots) for each candidate, in input order.
+
+    With more than one worker, candidates must be EncodedCheckpoint: each
+    worker decodes and aggregates one checkpoint and sends back only the
+    per-address totals. One checkpoint per worker plus one queued is in flight,
+    so memory grows with the number of workers but not with the input.
+    """
+    if workers <= 1:
+        for month, slot, checkpoint in candidates:
+            yield month, slot, aggregate_checkpoint(
+                checkpoint, requested_addresses, engine
             )
-        ]
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for month, slot, checkpoint in candidates:
+            future = executor.submit(
+                aggregate_encoded_checkpoint,
+                checkpoint.json_text,
+                slot,
+                requested_addresses,
+                engine,
+            )
+            in_flight.append((month, slot, future))
+            if len(in_flight) > workers:
+                month, slot, future = in_flight.popleft()
+                yield month, slot, future.result()
 
-    rows = [snapshots_by_month[month] for month in sorted(snapshots_by_month)]
-    if include_zero_months:
+        while in_flight:
+            month, slot, future = in_flight.popleft()
+            yield month, slot, future.result()
+
+
+def snapshots_by_month(
+    checkpoints,
+    requested_addresses,
+    genesis_unix,
+    workers=1,
+    engine="python",
+):
+    """Return {month: (slot, snapshots)} for the last checkpoint of each month."""
+    snapshots_for_month = {}
+
+    for month, slot, snapshots in aggregate_checkpoints(
+        last_checkpoint_per_month(checkpoints, genesis_unix),
+        requested_addresses,
+        workers,
+        engine,
+    ):
+        current = snapshots_for_month.get(month)
+        if current is not None and slot < current[0]:
+            continue
+
+        for snapshot in snapshots:
+            snapshot["month"] = month
+        snapshots_for_month[month] = (slot, snapshots)
+
+    return snapshots_for_month
+
+
+def address_snapshots_by_month(all_snapshots_by_month, requested_addresses):
+    """Narrow all-address monthly snapshots to the requested addresses."""
+    selected = {}
+    for month, (slot, snapshots) in all_snapshots_by_month.items():
+        by_address = {
+            snapshot["withdrawal_address"]: snapshot for snapshot in snapshots
+        }
+        selected_snapshots = []
+        for address in requested_addresses:
+            snapshot = by_address.get(address)
+            if snapshot is None:
+                snapshot = empty_snapshot(address, slot)
+                snapshot["month"] = month
+            selected_snapshots.append(snapshot)
+        selected[month] = (slot, selected_snapshots)
+    return selected
+
+
+def monthly_rows(snapshots_for_month, requested_addresses, include_zero_months):
+    rows = sorted(
+        (
+            snapshot
+            for _, snapshots in snapshots_for_month.values()
+            for snapshot in snapshots
+        ),
+        key=lambda snapshot: (snapshot["withdrawal_address"], snapshot["month"]),
+    )
+    if not requested_addresses or include_zero_months:
         return rows
 
     return [snapshot for snapshot in rows if snapshot["matched_validators"] > 0]
 
 
+def monthly_snapshots(
+    checkpoints,
+    requested_addresses,
+    genesis_unix,
+    include_zero_months,
+    workers=1,
+    engine="python",
+):
+    """Aggregate only the last checkpoint of each UTC month."""
+    return monthly_rows(
+        snapshots_by_month(
+            checkpoints, requested_addresses, genesis_unix, workers, engine
+        ),
+        requested_addresses,
+        include_zero_months,
+    )
+
+
+def cached_monthly_snapshots(
+    cache_path,
+    checkpoints,
+    requested_addresses,
+    genesis_unix,
+    include_zero_months,
+    workers=1,
+    engine="python",
+):
+    """Like monthly_snapshots, reusing months stored in the SQLite cache.
+
+    The cache always holds every withdrawal address so that any filter can be
+    answered from it; checkpoints at or below the last cached slot are skipped.
+    """
+    with SnapshotCache(cache_path, genesis_unix) as cache:
+        all_snapshots_by_month = cache.load()
+        new_snapshots_by_month = snapshots_by_month(
+            checkpoints_after(checkpoints, cache.last_slot(all_snapshots_by_month)),
+            None,
+            genesis_unix,
+            workers,
+            engine,
+        )
+        cache.store(new_snapshots_by_month)
+
+    all_snapshots_by_month.update(new_snapshots_by_month)
+    if requested_addresses:
+        all_snapshots_by_month = address_snapshots_by_month(
+            all_snapshots_by_month, requested_addresses
+        )
+    return monthly_rows(
+        all_snapshots_by_month, requested_addresses, include_zero_months
+    )
+
+
+class SnapshotCache:
+    """Per-month, per-address snapshots persisted in a SQLite file.
+
+    Wei amounts are stored as decimal text because they overflow SQLite
+    integers. Changing the genesis timestamp invalidates every month.
+    """
+
+    def __init__(self, path, genesis_unix):
+        self.path = path
+        self.genesis_unix = str(genesis_unix)
+        self.connection = None
+
+    def __enter__(self):
+        self.connection = sqlite3.connect(self.path)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS months (
+                month TEXT PRIMARY KEY,
+                checkpoint_slot INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS snapshots (
+                month TEXT NOT NULL,
+                withdrawal_address TEXT NOT NULL,
+                matched_validators INTEGER NOT NULL,
+                accumulated_rewards_wei TEXT NOT NULL,
+                pending_rewards_wei TEXT NOT NULL,
+                PRIMARY KEY (month, withdrawal_address)
+            );
+            """
+        )
+        expected = {
+            "schema_version": CACHE_SCHEMA_VERSION,
+            "genesis_unix": self.genesis_unix,
+        }
+        stored = dict(self.connection.execute("SELECT key, value FROM meta"))
+        if stored != expected:
+            with self.connection:
+                self.connection.execute("DELETE FROM snapshots")
+                self.connection.execute("DELETE FROM months")
+                self.connection.execute("DELETE FROM meta")
+                self.connection.executemany(
+                    "INSERT INTO meta (key, value) VALUES (?, ?)",
+                    expected.items(),
+                )
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.connection.close()
+        self.connection = None
+
+    @staticmethod
+    def last_slot(snapshots_for_month):
+        return max((slot for slot, _ in snapshots_for_month.values()), default=-1)
+
+    def load(self):
+        snapshots_for_month = {
+            month: (slot, [])
+            for month, slot in self.connection.execute(
+                "SELECT month, checkpoint_slot FROM months"
+            )
+        }
+        rows = self.connection.execute(
+            "SELECT month, withdrawal_address, matched_validators, "
+            "accumulated_rewards_wei, pending_rewards_wei FROM snapshots"
+        )
+        for month, address, matched, accumulated, pending in rows:
+            slot, snapshots = snapshots_for_month[month]
+            accumulated = int(accumulated)
+            pending = int(pending)
+            snapshots.append(
+                {
+                    "withdrawal_address": address,
+                    "slot": slot,
+                    "matched_validators": matched,
+                    "accumulated_rewards_wei": accumulated,
+                    "pending_rewards_wei": pending,
+                    "total_rewards_wei": accumulated + pending,
+                    "month": month,
+                }
+            )
+        return snapshots_for_month
+
+    def store(self, snapshots_for_month):
+        with self.connection:
+            for month, (slot, snapshots) in snapshots_for_month.items():
+                self.connection.execute(
+                    "DELETE FROM snapshots WHERE month = ?", (month,)
+                )
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO months (month, checkpoint_slot) "
+                    "VALUES (?, ?)",
+                    (month, slot),
+                )
+                self.connection.executemany(
+                    "INSERT INTO snapshots (month, withdrawal_address, "
+                    "matched_validators, accumulated_rewards_wei, "
+                    "pending_rewards_wei) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        (
+                            month,
+                            snapshot["withdrawal_address"],
+                            snapshot["matched_validators"],
+                            str(snapshot["accumulated_rewards_wei"]),
+                            str(snapshot["pending_rewards_wei"]),
+                        )
+                        for snapshot in snapshots
+                    ),
+                )
+
+
+def split_wei(wei):
+    if not -(1 << 127) <= wei < (1 << 127):
+        raise ValueError(f"Wei amount does not fit in a snapshot file: {wei}")
+    return wei & 0xFFFFFFFFFFFFFFFF, wei >> 64
+
+
+def write_snapshot_file(path, checkpoints, workers=1, engine="python"):
+    """Write per-address aggregates of every checkpoint to a binary file.
+
+    Returns the number of checkpoints written.
+    """
+    address_index = {}
+    checkpoint_table = []
+
+    with open(path, "wb") as snapshot_file:
+        snapshot_file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, 0, 0, 0, 0))
+        candidates = (
+            (None, parse_int(checkpoint.get("slot"), "slot"), checkpoint)
+            for checkpoint in checkpoints
+        )
+        for _, slot, snapshots in aggregate_checkpoints(
+            candidates, None, workers, engine
+        ):
+            records = []
+            for snapshot in snapshots:
+                address = snapshot["withdrawal_address"]
+                index = address_index.setdefault(address, len(address_index))
+                records.append(
+                    SNAPSHOT_RECORD.pack(
+                        index,
+                        snapshot["matched_validators"],
+                        *split_wei(snapshot["accumulated_rewards_wei"]),
+                        *split_wei(snapshot["pending_rewards_wei"]),
+                    )
+                )
+            checkpoint_table.append((slot, snapshot_file.tell(), len(records)))
+            snapshot_file.write(b"".join(records))
+
+        address_table_offset = snapshot_file.tell()
+        for address in address_index:
+            encoded = address.encode("utf-8")
+            snapshot_file.write(SNAPSHOT_ADDRESS_LENGTH.pack(len(encoded)))
+            snapshot_file.write(encoded)
+
+        checkpoint_table_offset = snapshot_file.tell()
+        for entry in checkpoint_table:
+            snapshot_file.write(SNAPSHOT_CHECKPOINT.pack(*entry))
+
+        snapshot_file.seek(0)
+        snapshot_file.write(
+            SNAPSHOT_HEADER.pack(
+                SNAPSHOT_MAGIC,
+                address_table_offset,
+                len(address_index),
+                checkpoint_table_offset,
+                len(checkpoint_table),
+            )
+        )
+
+    return len(checkpoint_table)
+
+
+class SnapshotFile:
+    """Memory-mapped reader for files written by write_snapshot_file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.mapping = None
+        self.addresses = []
+        self.checkpoint_table = []
+
+    def __enter__(self):
+        self.file = open(self.path, "rb")
+        try:
+            self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._read_tables()
+        except (ValueError, struct.error) as exc:
+            self.__exit__(None, None, None)
+            raise ValueError(f"{self.path} is not a valid snapshot file") from exc
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self.mapping is not None:
+            self.mapping.close()
+            self.mapping = None
+        self.file.close()
+
+    def _read_tables(self):
+        (
+            magic,
+            address_table_offset,
+            address_count,
+            checkpoint_table_offset,
+            checkpoint_count,
+        ) = SNAPSHOT_HEADER.unpack_from(self.mapping, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("bad magic")
+
+        offset = address_table_offset
+        for _ in range(address_count):
+            (length,) = SNAPSHOT_ADDRESS_LENGTH.unpack_from(self.mapping, offset)
+            offset += SNAPSHOT_ADDRESS_LENGTH.size
+            self.addresses.append(self.mapping[offset:offset + length].decode("utf-8"))
+            offset += length
+
+        end = checkpoint_table_offset + checkpoint_count * SNAPSHOT_CHECKPOINT.size
+        self.checkpoint_table = list(
+            SNAPSHOT_CHECKPOINT.iter_unpack(self.mapping[checkpoint_table_offset:end])
+        )
+
+    def checkpoints(self):
+        """Return lightweight {"slot", "index"} checkpoints sorted by slot."""
+        return sort_checkpoints(
+            {"slot": slot, "index": index}
+            for index, (slot, _, _) in enumerate(self.checkpoint_table)
+        )
+
+    def checkpoint_snapshots(self, index, month):
+        slot, offset, count = self.checkpoint_table[index]
+        records = self.mapping[offset:offset + count * SNAPSHOT_RECORD.size]
+        snapshots = []
+        for (
+            address_index,
+            matched_validators,
+            accumulated_low,
+            accumulated_high,
+            pending_low,
+            pending_high,
+        ) in SNAPSHOT_RECORD.iter_unpack(records):
+            accumulated = (accumulated_high << 64) + accumulated_low
+            pending = (pending_high << 64) + pending_low
+            snapshots.append(
+                {
+                    "withdrawal_address": self.addresses[address_index],
+                    "slot": slot,
+                    "matched_validators": matched_validators,
+                    "accumulated_rewards_wei": accumulated,
+                    "pending_rewards_wei": pending,
+                    "total_rewards_wei": accumulated + pending,
+                    "month": month,
+                }
+            )
+        return snapshots
+
+
+def snapshot_file_monthly_snapshots(
+    snapshot_path,
+    requested_addresses,
+    genesis_unix,
+    include_zero_months,
+):
+    """Like monthly_snapshots, reading pre-aggregated checkpoints from disk.
+
+    Only the records of each month's last checkpoint are unpacked.
+    """
+    with SnapshotFile(snapshot_path) as snapshot_file:
+        all_snapshots_by_month = {
+            month: (
+                slot,
+                snapshot_file.checkpoint_snapshots(checkpoint["index"], month),
+            )
+            for month, slot, checkpoint in last_checkpoint_per_month(
+                snapshot_file.checkpoints(), genesis_unix
+            )
+        }
+
+    if requested_addresses:
+        all_snapshots_by_month = address_snapshots_by_month(
+            all_snapshots_by_month, requested_addresses
+        )
+    return monthly_rows(
+        all_snapshots_by_month, requested_addresses, include_zero_months
+    )
+
+
 def add_deltas(monthly_rows, include_withdrawal_address):
+    """Yield output rows one at a time so writers can stream them."""
     previous_by_address = {}
     previous_single = None
-    rows = []
 
     for snapshot in monthly_rows:
         previous_key = (
@@ -338,14 +1392,13 @@ def add_deltas(monthly_rows, include_withdrawal_address):
             }
         )
         add_eth_columns(row)
-        rows.append(row)
 
         if include_withdrawal_address:
             previous_by_address[previous_key] = snapshot
         else:
             previous_single = snapshot
 
-    return rows
+        yield row
 
 
 def add_eth_columns(row):
@@ -376,60 +1429,137 @@ def write_output(rows, output_format, output_path, columns):
     )
     try:
         if output_format == "json":
-            json.dump(rows, output_file, indent=2)
-            output_file.write("\n")
+            write_json_array(rows, output_file)
+        elif output_format == "jsonl":
+            for row in rows:
+                output_file.write(json.dumps(row))
+                output_file.write("\n")
         elif output_format == "csv":
             writer = csv.DictWriter(output_file, fieldnames=columns)
             writer.writeheader()
             writer.writerows(rows)
         else:
-            output_file.write(format_table(rows, columns))
-            output_file.write("\n")
+            write_table(rows, columns, output_file)
     finally:
         if output_path:
             output_file.close()
 
 
-def format_table(rows, columns):
-    if not rows:
-        return "No matching monthly checkpoints found."
+def write_json_array(rows, output_file):
+    """Stream rows in the same layout as json.dump(rows, indent=2)."""
+    output_file.write("[")
+    wrote_row = False
+    for row in rows:
+        output_file.write(",\n  " if wrote_row else "\n  ")
+        output_file.write(json.dumps(row, indent=2).replace("\n", "\n  "))
+        wrote_row = True
+    output_file.write("\n]\n" if wrote_row else "]\n")
+
+
+def write_table(rows, columns, output_file):
+    """Write an aligned table without holding the rows in memory.
+
+    The first pass spools the stringified rows to a temporary file while
+    measuring column widths; the second pass reads them back and pads them.
+    """
+    widths = {column: len(column) for column in columns}
+    with tempfile.TemporaryFile("w+", newline="", encoding="utf-8") as spool:
+        spool_writer = csv.writer(spool)
+        wrote_row = False
+        for row in rows:
+            values = [str(row[column]) for column in columns]
+            for column, value in zip(columns, values):
+                widths[column] = max(widths[column], len(value))
+            spool_writer.writerow(values)
+            wrote_row = True
+
+        if not wrote_row:
+            output_file.write("No matching monthly checkpoints found.\n")
+            return
+
+        output_file.write(
+            " | ".join(column.ljust(widths[column]) for column in columns)
+        )
+        output_file.write("\n")
+        output_file.write("-+-".join("-" * widths[column] for column in columns))
+        output_file.write("\n")
+
+        spool.seek(0)
+        for values in csv.reader(spool):
+            output_file.write(
+                " | ".join(
+                    value.rjust(widths[column])
+                    for column, value in zip(columns, values)
+                )
+            )
+            output_file.write("\n")
 
-    string_rows = [
-        {column: str(row[column]) for column in columns}
-        for row in rows
-    ]
-    widths = {
-        column: max(len(column), *(len(row[column]) for row in string_rows))
-        for column in columns
-    }
 
-    header = " | ".join(column.ljust(widths[column]) for column in columns)
-    separator = "-+-".join("-" * widths[column] for column in columns)
-    body = [
-        " | ".join(row[column].rjust(widths[column]) for column in columns)
-        for row in string_rows
-    ]
-    return "\n".join([header, separator, *body])
+@contextlib.contextmanager
+def open_checkpoints(args):
+    if args.stream:
+        with open_state_stream(args) as state_stream:
+            yield stream_committed_states(state_stream, keep_text=args.workers > 1)
+        return
+
+    state = load_state(args)
+    committed_states = extract_committed_states(state)
+    yield sort_checkpoints(normalize_committed_states(committed_states))
+
+
+def build_monthly_snapshots(args, checkpoints, requested_addresses):
+    if args.cache_file:
+        return cached_monthly_snapshots(
+            args.cache_file,
+            checkpoints,
+            requested_addresses,
+            args.genesis_unix,
+            args.include_zero_months,
+            args.workers,
+            args.engine,
+        )
+
+    return monthly_snapshots(
+        checkpoints,
+        requested_addresses,
+        args.genesis_unix,
+        args.include_zero_months,
+        args.workers,
+        args.engine,
+    )
 
 
 def main():
     args = parse_args()
-    requested_address = (
-        normalize_address(args.withdrawal_address)
+    requested_addresses = (
+        sorted({normalize_address(address) for address in args.withdrawal_address})
         if args.withdrawal_address
         else None
     )
-    include_withdrawal_address = requested_address is None
+    include_withdrawal_address = (
+        requested_addresses is None or len(requested_addresses) > 1
+    )
 
     try:
-        state = load_state(args)
-        committed_states = extract_committed_states(state)
-        snapshots = monthly_snapshots(
-            committed_states,
-            requested_address,
-            args.genesis_unix,
-            args.include_zero_months,
-        )
+        if args.snapshot_file:
+            snapshots = snapshot_file_monthly_snapshots(
+                args.snapshot_file,
+                requested_addresses,
+                args.genesis_unix,
+                args.include_zero_months,
+            )
+        else:
+            with open_checkpoints(args) as checkpoints:
+                if args.write_snapshot:
+                    count = write_snapshot_file(
+                        args.write_snapshot, checkpoints, args.workers, args.engine
+                    )
+                    print(f"Wrote {count} checkpoints to {args.write_snapshot}")
+                    return 0
+
+                snapshots = build_monthly_snapshots(
+                    args, checkpoints, requested_addresses
+                )
         rows = add_deltas(snapshots, include_withdrawal_address)
         write_output(
             rows,
@@ -437,12 +1567,18 @@ def main():
             args.output,
             output_columns(include_withdrawal_address),
         )
-    except (urllib.error.URLError, TimeoutError) as exc:
+    except (urllib.error.URLError, TimeoutError, EOFError, gzip.BadGzipFile) as exc:
         print(f"Failed to fetch /state: {exc}", file=sys.stderr)
         return 1
     except (KeyError, TypeError, ValueError, json.JSONDecodeError) as exc:
         print(f"Failed to process state: {exc}", file=sys.stderr)
         return 1
+    except sqlite3.Error as exc:
+        print(f"Failed to use snapshot cache: {exc}", file=sys.stderr)
+        return 1
+    except OSError as exc:
+        print(f"Failed to access file: {exc}", file=sys.stderr)
+        return 1
 
     return 0
 
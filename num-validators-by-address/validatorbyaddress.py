@@ -1,15 +1,15 @@
+import os
+import sys
 import requests
 import csv
 from collections import defaultdict
 
-# URL to fetch the data
-url = "https://sp-api.dappnode.io/memory/validators"
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import sp_api
 
 # Step 1: Fetch the data from the API
 try:
-    response = requests.get(url)
-    response.raise_for_status()
-    data = response.json()
+    data = sp_api.validators()
 except requests.exceptions.RequestException as e:
     print(f"An error occurred: {e}")
     exit(1)
@@ -1,10 +1,12 @@
-import requests
+import os
+import sys
 from collections import Counter
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import sp_api
+
 # Fetch data from the API
-url = "https://sp-api.dappnode.io/memory/validators"
-response = requests.get(url)
-data = response.json()
+data = sp_api.validators()
 
 # Count all beacon_statuses
 beacon_statuses = [item["beacon_status"] for item in data if "beacon_status" in item]
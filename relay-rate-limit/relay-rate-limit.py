@@ -1,7 +1,12 @@
-import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import time
+import argparse
+import asyncio
+import hashlib
 import json
+import math
+import statistics
+import time
+
+import aiohttp
 
 # List of API endpoints
 endpoints = [
@@ -19,58 +24,287 @@ endpoints = [
 endpoint_path = "/relay/v1/data/validator_registration"
 pubkey = "0xa7396f2b6255f1598aad576ea429515077322461531098878226a949b369b0063fee82adaa5df2ad8f9f7d07c3796be2"
 
-# Function to send a request and return the entire response
-def send_request(endpoint):
-    url = f"{endpoint}{endpoint_path}?pubkey={pubkey}"
+
+# Share of 429s in one second of requests that marks the start of rate limiting
+ONSET_SHARE = 0.05
+# Unique response bodies kept per relay; further ones are only counted
+MAX_UNIQUE_RESPONSES = 100
+BODY_SAMPLE_CHARS = 500
+
+
+class LatencyHistogram:
+    """Fixed-memory latency histogram in the style of HdrHistogram.
+
+    Latencies are counted in microseconds. Values under SUB_BUCKETS are exact,
+    and every higher power of two is split into SUB_BUCKETS linear buckets.
+    A bucket is reported as its midpoint, which is within 1/(2 * SUB_BUCKETS)
+    (about 0.8%) of any latency recorded in it, and memory does not grow with
+    the number of requests."""
+
+    SUB_BUCKETS = 64
+
+    def __init__(self, max_seconds=600):
+        self.max_us = int(max_seconds * 1_000_000)
+        self.counts = [0] * (self.index(self.max_us) + 1)
+        self.total = 0
+        self.max_us_seen = 0
+
+    def index(self, us):
+        if us < self.SUB_BUCKETS:
+            return us
+        shift = us.bit_length() - self.SUB_BUCKETS.bit_length()
+        return self.SUB_BUCKETS * (shift + 1) + (us >> shift) - self.SUB_BUCKETS
+
+    def value(self, index):
+        # Midpoint of the bucket, in microseconds
+        if index < self.SUB_BUCKETS:
+            return index
+        shift = index // self.SUB_BUCKETS - 1
+        low = (self.SUB_BUCKETS + index % self.SUB_BUCKETS) << shift
+        return low + ((1 << shift) - 1) / 2
+
+    def record(self, seconds):
+        us = min(self.max_us, max(0, int(seconds * 1_000_000)))
+        self.counts[self.index(us)] += 1
+        self.total += 1
+        self.max_us_seen = max(self.max_us_seen, us)
+
+    def percentile(self, percent):
+        """Latency in milliseconds below which percent% of requests fall."""
+        if not self.total:
+            return None
+        target = max(1, math.ceil(self.total * percent / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return round(min(self.value(index), self.max_us_seen) / 1000, 3)
+
+    def summary(self):
+        return {
+            "count": self.total,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": round(self.max_us_seen / 1000, 3) if self.total else None,
+        }
+
+
+class RelayStats:
+    """Outcome counters, latencies and per-second time series for one relay."""
+
+    def __init__(self):
+        self.sent = 0
+        self.skipped = 0  # not sent because --concurrency requests were in flight
+        self.results = {}
+        self.latency = LatencyHistogram()  # every request, failed ones included
+        self.error_latency = LatencyHistogram()  # connection errors and timeouts only
+        self.per_second = []  # by second the request was sent in
+        self.unique_responses = {}  # body hash -> {"status", "count", "sample"}
+        self.other_responses = 0
+
+    def second(self, offset):
+        index = int(offset)
+        while len(self.per_second) <= index:
+            self.per_second.append({"sent": 0, "skipped": 0, "statuses": {}})
+        return self.per_second[index]
+
+    def record(self, status, content, sent_at, latency):
+        self.results[status] = self.results.get(status, 0) + 1
+        statuses = self.second(sent_at)["statuses"]
+        statuses[status] = statuses.get(status, 0) + 1
+        self.latency.record(latency)
+        if status == "Error":
+            self.error_latency.record(latency)
+
+        # Keep one truncated sample per distinct body instead of every body
+        digest = hashlib.sha256(f"{status}\n{content}".encode()).hexdigest()
+        if digest in self.unique_responses:
+            self.unique_responses[digest]["count"] += 1
+        elif len(self.unique_responses) < MAX_UNIQUE_RESPONSES:
+            self.unique_responses[digest] = {"status": status, "count": 1,
+                                             "sample": content[:BODY_SAMPLE_CHARS]}
+        else:
+            self.other_responses += 1
+
+    def rate_limit(self):
+        """Find the first second with at least ONSET_SHARE 429s, and the
+        median rate of non-429 responses from then on as the sustained limit.
+        The last second is left out as it is usually partial."""
+        onset = None
+        for second, bucket in enumerate(self.per_second):
+            answered = sum(bucket["statuses"].values())
+            if answered and bucket["statuses"].get(429, 0) / answered >= ONSET_SHARE:
+                onset = second
+                break
+        if onset is None:
+            return {"reached": False, "onset_second": None, "offered_rps_at_onset": None, "sustained_rps": None}
+
+        limited = self.per_second[onset:-1] or self.per_second[onset:]
+        accepted = [sum(count for status, count in bucket["statuses"].items() if status not in (429, "Error"))
+                    for bucket in limited]
+        return {
+            "reached": True,
+            "onset_second": onset,
+            "offered_rps_at_onset": self.per_second[onset]["sent"],
+            "sustained_rps": statistics.median(accepted),
+        }
+
+    def report(self, endpoint, elapsed_time):
+        return {
+            "endpoint": endpoint,
+            "elapsed_seconds": round(elapsed_time, 3),
+            "sent": self.sent,
+            "skipped": self.skipped,
+            "achieved_rps": round(self.sent / elapsed_time, 2),
+            "status_counts": {str(status): count for status, count in self.results.items()},
+            "latency_ms": self.latency.summary(),
+            "error_latency_ms": self.error_latency.summary(),
+            "rate_limit": self.rate_limit(),
+            "per_second": [
+                {"second": second, "sent": bucket["sent"], "skipped": bucket["skipped"],
+                 "statuses": {str(status): count for status, count in bucket["statuses"].items()}}
+                for second, bucket in enumerate(self.per_second)
+            ],
+            "unique_responses": [dict(entry, sha256=digest) for digest, entry in self.unique_responses.items()],
+            "other_responses": self.other_responses,
+        }
+
+
+def send_offset(index, args):
+    """Seconds after the start at which request number index is sent.
+
+    The rate ramps linearly up to --rps over --ramp-up seconds and then holds,
+    so request index goes out when the requests offered so far, the integral
+    of the rate (rps * t^2 / (2 * ramp_up) during the ramp), reach index."""
+    ramp_requests = args.rps * args.ramp_up / 2
+    if args.ramp_up <= 0:
+        return index / args.rps
+    if index <= ramp_requests:
+        return math.sqrt(2 * args.ramp_up * index / args.rps)
+    return args.ramp_up + (index - ramp_requests) / args.rps
+
+
+# Function to send a request and record its outcome
+async def send_request(session, url, stats, sent_at):
+    started = time.perf_counter()
     try:
-        response = requests.get(url)
-        return response
-    except requests.RequestException as e:
-        return f"Error: {str(e)}"
+        async with session.get(url) as response:
+            text = await response.text()
+            latency = time.perf_counter() - started
+            try:
+                # Attempt to parse JSON response, otherwise log text
+                content = json.loads(text)
+                content = json.dumps(content, sort_keys=True) if isinstance(content, dict) else text
+            except ValueError:
+                content = text
+            stats.record(response.status, content, sent_at, latency)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        stats.record("Error", f"Error: {type(e).__name__}: {e}", sent_at, time.perf_counter() - started)
+
 
-# Function to handle requests for each relay
-def perform_requests(endpoint):
+# Function to load one relay at the target rate for the test duration
+async def perform_requests(endpoint, args):
     print(f"Starting requests for {endpoint}")
-    start_time = time.time()
-    results = {}
-    unique_responses = set()
-
-    with ThreadPoolExecutor(max_workers=100) as executor:
-        futures = [executor.submit(send_request, endpoint) for _ in range(2000)]
-        for future in as_completed(futures):
-            response = future.result()
-            if isinstance(response, requests.Response):
-                # Process HTTP responses
-                status_code = response.status_code
-                results[status_code] = results.get(status_code, 0) + 1
-                try:
-                    # Attempt to parse JSON response, otherwise log text
-                    response_content = response.json()
-                except ValueError:
-                    response_content = response.text
-                unique_responses.add((status_code, json.dumps(response_content, sort_keys=True) if isinstance(response_content, dict) else response_content))
+    url = f"{endpoint}{endpoint_path}?pubkey={pubkey}"
+    stats = RelayStats()
+    loop = asyncio.get_running_loop()
+
+    # One connection pool per relay, sized to the allowed concurrency
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        in_flight = set()
+        start_time = loop.time()
+        index = 0
+        next_send = start_time
+        # Open loop: requests go out on schedule whether or not earlier ones
+        # have answered, so a slow relay cannot lower the offered load.
+        while next_send - start_time < args.duration:
+            await asyncio.sleep(max(0.0, next_send - loop.time()))
+            sent_at = next_send - start_time
+            if len(in_flight) >= args.concurrency:
+                stats.skipped += 1
+                stats.second(sent_at)["skipped"] += 1
             else:
-                # Process non-HTTP responses (errors)
-                unique_responses.add(("Error", response))
+                task = asyncio.create_task(send_request(session, url, stats, sent_at))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+                stats.sent += 1
+                stats.second(sent_at)["sent"] += 1
+            index += 1
+            next_send = start_time + send_offset(index, args)
+        if in_flight:
+            await asyncio.gather(*in_flight)
+        elapsed_time = loop.time() - start_time
 
-    end_time = time.time()
-    elapsed_time = end_time - start_time
-    print(f"Finished requests for {endpoint}. Time elapsed: {elapsed_time:.2f} seconds")
+    latency = stats.latency
+    limit = stats.rate_limit()
+    print(f"Finished requests for {endpoint}. Time elapsed: {elapsed_time:.2f} seconds, "
+          f"{stats.sent / elapsed_time:.1f} req/s achieved, "
+          f"p50/p90/p99 {latency.percentile(50)}/{latency.percentile(90)}/{latency.percentile(99)} ms, "
+          + (f"429s from second {limit['onset_second']}, sustained limit ~{limit['sustained_rps']} req/s"
+             if limit["reached"] else "no rate limit reached"))
+    return endpoint, elapsed_time, stats
 
-    # Writing results to file after each relay
-    with open("relay-results-api-2000.txt", "a") as file:
+
+def write_results(filename, endpoint, elapsed_time, stats, args):
+    with open(filename, "a") as file:
         file.write(f"{endpoint}:\n")
         file.write(f"Elapsed Time: {elapsed_time:.2f} seconds\n")
-        for status, count in results.items():
+        file.write(f"Target: {args.rps} req/s for {args.duration}s "
+                   f"(ramp-up {args.ramp_up}s, concurrency {args.concurrency})\n")
+        file.write(f"Sent: {stats.sent} requests ({stats.sent / elapsed_time:.1f} req/s), "
+                   f"skipped at concurrency limit: {stats.skipped}\n")
+        for status, count in stats.results.items():
             status_label = f"Status {status}"
             file.write(f"{status_label}: {count} times\n")
         file.write("Unique Responses:\n")
-        for status, response in unique_responses:
-            file.write(f"Status {status}: {response}\n")
+        for entry in stats.unique_responses.values():
+            file.write(f"Status {entry['status']} ({entry['count']} times): {entry['sample']}\n")
+        if stats.other_responses:
+            file.write(f"{stats.other_responses} more responses with other bodies\n")
         file.write("\n")
 
-# Iterating over each endpoint
-for endpoint in endpoints:
-    perform_requests(endpoint)
 
-print("All requests completed. Check relay-results-api.txt for summaries.")
\ No newline at end of file
+async def main(args):
+    selected = [endpoint for endpoint in args.endpoint or endpoints
+                if not args.relay or any(name in endpoint for name in args.relay)]
+    # All relays are tested at the same time, each with its own pool
+    reports = []
+    for endpoint, elapsed_time, stats in await asyncio.gather(
+            *(perform_requests(endpoint, args) for endpoint in selected)):
+        write_results(args.output, endpoint, elapsed_time, stats, args)
+        reports.append(stats.report(endpoint, elapsed_time))
+
+    with open(args.json_output, "w") as file:
+        json.dump({
+            "target": {"rps": args.rps, "duration": args.duration, "ramp_up": args.ramp_up,
+                       "concurrency": args.concurrency},
+            "relays": reports,
+        }, file, indent=2)
+    print(f"All requests completed. Check {args.output} for summaries and {args.json_output} for the JSON report.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the validator registration endpoint of every relay.")
+    parser.add_argument("--rps", type=float, default=50, help="target requests per second per relay (default 50)")
+    parser.add_argument("--duration", type=float, default=40, help="seconds to send requests for (default 40)")
+    parser.add_argument("--concurrency", type=int, default=100,
+                        help="maximum requests in flight per relay (default 100)")
+    parser.add_argument("--ramp-up", type=float, default=10,
+                        help="seconds to ramp linearly up to --rps, 0 starts at full rate (default 10)")
+    parser.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds (default 30)")
+    parser.add_argument("--endpoint", action="append",
+                        help="relay URL to test instead of the built-in list (repeatable)")
+    parser.add_argument("--relay", action="append",
+                        help="only test relays whose URL contains this text (repeatable)")
+    parser.add_argument("--output", default="relay-results-api-2000.txt",
+                        help="file the summaries are appended to (default relay-results-api-2000.txt)")
+    parser.add_argument("--json-output", default="relay-results.json",
+                        help="file the JSON report with latencies and rate limits is written to "
+                             "(default relay-results.json)")
+    args = parser.parse_args()
+    if args.rps <= 0 or args.duration <= 0 or args.concurrency < 1:
+        parser.error("--rps and --duration must be positive and --concurrency at least 1")
+    asyncio.run(main(args))
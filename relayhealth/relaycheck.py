@@ -1,3 +1,11 @@
+import argparse
+import http.client
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
 import requests
 
 # List of relay URLs
@@ -24,5 +32,133 @@ def check_relay_health(relay_urls):
         except requests.exceptions.RequestException as e:
             print(f"Relay {url} is unreachable. Error: {e}")
 
-# Check the health of the relays
-check_relay_health(relays)
+
+# Builder API endpoints probed on each relay. The status endpoint is what
+# MEV-Boost polls; the data API serves the delivered payloads Smooth reads.
+PROBE_PATHS = {
+    "status": "/eth/v1/builder/status",
+    "data": "/relay/v1/data/bidtraces/proposer_payload_delivered?limit=1",
+}
+
+
+def probe_endpoint(url, path, timeout):
+    """GET path on the relay and time it with a fresh connection.
+
+    connect_ms covers DNS, TCP and TLS, ttfb_ms runs until the status line
+    arrives, and total_ms until the body is read. Times are measured from the
+    start of the probe, so they add up rather than overlap."""
+    parts = urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    # The relay URL carries its public key as userinfo, which is not sent
+    connection = connection_class(parts.hostname, parts.port, timeout=timeout)
+    result = {"path": path, "status_code": None, "connect_ms": None, "ttfb_ms": None, "total_ms": None, "error": None}
+    start = time.perf_counter()
+    try:
+        connection.connect()
+        result["connect_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        connection.request("GET", path, headers={"Accept": "application/json"})
+        response = connection.getresponse()
+        result["ttfb_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        response.read()
+        result["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        result["status_code"] = response.status
+    except (OSError, http.client.HTTPException) as e:
+        result["error"] = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+    finally:
+        connection.close()
+    return result
+
+
+def endpoint_state(result, thresholds):
+    if result["error"] is not None or result["status_code"] != 200:
+        return "down"
+    for name, limit in thresholds.items():
+        if result[name] > limit:
+            return "slow"
+    return "ok"
+
+
+def probe_relays(relay_urls, timeout, thresholds):
+    """Probe every endpoint of every relay at once.
+
+    A dead relay costs at most `timeout` seconds, however many relays there
+    are. A relay is down if any endpoint fails or does not return 200, and
+    slow if any endpoint is over a latency threshold."""
+    jobs = [(url, name, path) for url in relay_urls for name, path in PROBE_PATHS.items()]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+        results = list(executor.map(lambda job: probe_endpoint(job[0], job[2], timeout), jobs))
+
+    report = {
+        "checked_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "thresholds_ms": thresholds,
+        "relays": [],
+    }
+    by_relay = {}
+    for (url, name, _), result in zip(jobs, results):
+        result["state"] = endpoint_state(result, thresholds)
+        by_relay.setdefault(url, {})[name] = result
+    for url in relay_urls:
+        endpoints = by_relay[url]
+        states = {result["state"] for result in endpoints.values()}
+        state = "down" if "down" in states else "slow" if "slow" in states else "ok"
+        report["relays"].append({"relay": urlsplit(url).netloc.rsplit("@", 1)[-1], "state": state, "endpoints": endpoints})
+    report["healthy"] = all(relay["state"] == "ok" for relay in report["relays"])
+    return report
+
+
+def write_report(report, path):
+    # Write through a temporary file so readers never see a partial report
+    with open(path + ".tmp", "w") as f:
+        json.dump(report, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def print_summary(report):
+    for relay in report["relays"]:
+        latencies = ", ".join(
+            f"{name} {result['status_code'] or result['error']} {result['total_ms'] or '-'} ms"
+            for name, result in relay["endpoints"].items())
+        print(f"{relay['state']:>4}  {relay['relay']}: {latencies}")
+    print(f"Checked {len(report['relays'])} relays in {report['duration_ms']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the Smooth relays are reachable")
+    parser.add_argument("--probe", action="store_true",
+                        help="probe the builder status and data API endpoints of all relays at once "
+                             "and report connect, TTFB and total latency")
+    parser.add_argument("--timeout", type=float, default=5,
+                        help="probe timeout in seconds for connecting and for each read (default 5)")
+    parser.add_argument("--max-connect-ms", type=float, default=1000,
+                        help="connect time above which a relay is slow (default 1000)")
+    parser.add_argument("--max-ttfb-ms", type=float, default=2000,
+                        help="time to first byte above which a relay is slow (default 2000)")
+    parser.add_argument("--max-total-ms", type=float, default=3000,
+                        help="total time above which a relay is slow (default 3000)")
+    parser.add_argument("--output", help="file the JSON report is written to, instead of stdout")
+    parser.add_argument("--interval", type=float, default=0,
+                        help="probe again every this many seconds, 0 probes once (default 0)")
+    args = parser.parse_args()
+
+    if not args.probe:
+        check_relay_health(relays)
+        return
+
+    thresholds = {"connect_ms": args.max_connect_ms, "ttfb_ms": args.max_ttfb_ms, "total_ms": args.max_total_ms}
+    while True:
+        started = time.monotonic()
+        report = probe_relays(relays, args.timeout, thresholds)
+        if args.output:
+            write_report(report, args.output)
+            print_summary(report)
+        else:
+            print(json.dumps(report), flush=True)
+        if args.interval <= 0:
+            raise SystemExit(0 if report["healthy"] else 1)
+        time.sleep(max(0, args.interval - (time.monotonic() - started)))
+
+
+if __name__ == "__main__":
+    main()
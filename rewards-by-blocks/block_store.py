@@ -0,0 +1,88 @@
+"""Optional columnar copy of block_data.csv.
+
+Blocks are stored as Parquet files in one directory, one file per range of
+PARTITION_SIZE block numbers, each sorted by block from highest to lowest.
+Appending rewrites only the partitions the new rows fall in.
+"""
+import glob
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pa_csv = pq = None
+
+PARTITION_SIZE = 100_000
+COLUMNS = ["payment", "slot", "block", "tx_count", "gas_used"]
+
+
+def require_pyarrow():
+    if pa is None:
+        raise SystemExit("BLOCK_DATA_STORE needs pyarrow: pip install pyarrow")
+
+
+def schema():
+    return pa.schema([
+        ("payment", pa.float64()),
+        ("slot", pa.int64()),
+        ("block", pa.int64()),
+        ("tx_count", pa.int64()),
+        ("gas_used", pa.int64()),
+    ])
+
+
+def partition_path(store_dir, partition):
+    first = partition * PARTITION_SIZE
+    return os.path.join(store_dir, f"blocks-{first:010d}-{first + PARTITION_SIZE - 1:010d}.parquet")
+
+
+def append_table(store_dir, table):
+    """Merge table into the partitions it covers. Rows in table replace
+    stored rows for the same block."""
+    require_pyarrow()
+    os.makedirs(store_dir, exist_ok=True)
+    table = table.select(COLUMNS).cast(schema())
+    partitions = [block // PARTITION_SIZE for block in table.column("block").to_pylist()]
+
+    for partition in sorted(set(partitions)):
+        rows = table.filter(pa.array([p == partition for p in partitions]))
+        path = partition_path(store_dir, partition)
+        if os.path.exists(path):
+            rows = pa.concat_tables([rows, pq.read_table(path)])
+
+        # Stable sort keeps the new row first among duplicates of a block
+        rows = rows.sort_by([("block", "descending")])
+        blocks = rows.column("block").to_pylist()
+        rows = rows.filter(pa.array([i == 0 or blocks[i] != blocks[i - 1] for i in range(len(blocks))]))
+
+        # The temporary name starts with "." so it never matches *.parquet,
+        # even if a run stops before the rename
+        temp_path = os.path.join(store_dir, "." + os.path.basename(path) + ".tmp")
+        pq.write_table(rows, temp_path)
+        os.replace(temp_path, path)
+
+
+def append_rows(store_dir, rows):
+    """Append rows in block_data.csv column order."""
+    require_pyarrow()
+    if rows:
+        columns = list(zip(*rows))
+        table = pa.table({name: pa.array(values).cast(schema().field(name).type)
+                          for name, values in zip(COLUMNS, columns)})
+        append_table(store_dir, table)
+
+
+def import_csv(csv_path, store_dir):
+    require_pyarrow()
+    append_table(store_dir, pa_csv.read_csv(csv_path))
+
+
+def load_columns(store_dir, columns):
+    """Read only the given columns from every partition."""
+    require_pyarrow()
+    paths = sorted(glob.glob(os.path.join(store_dir, "blocks-*.parquet")), reverse=True)
+    if not paths:
+        raise SystemExit(f"No block data in {store_dir}, run rewards.py --build-store first")
+    return pa.concat_tables([pq.read_table(path, columns=columns) for path in paths])
@@ -1,32 +1,153 @@
+import hashlib
+import json
+import math
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from dotenv import load_dotenv
+import block_store
 
 # --- Configurations ---
 load_dotenv()
 n_simulations = int(os.getenv("NUM_CALLS", "20000"))
 validators_my_pool = int(os.getenv("VALIDATORS_MY_POOL", "1350"))
 pool_fee = float(os.getenv("POOL_FEE", "0.93"))
+seed = os.getenv("SEED")
+max_draws_per_chunk = int(os.getenv("MAX_DRAWS_PER_CHUNK", str(2**22)))
+workers = int(os.getenv("WORKERS", "1"))
+simulations_per_job = int(os.getenv("SIMULATIONS_PER_JOB", "5000"))
+seed_sequence = np.random.SeedSequence(int(seed) if seed else None)
+bootstrap_seed_sequence = seed_sequence.spawn(1)[0]
+exact_min_blocks = int(os.getenv("EXACT_MIN_BLOCKS", "100"))
+bootstrap_samples = int(os.getenv("BOOTSTRAP_SAMPLES", "100000"))
+sweep = os.getenv("SWEEP", "").lower() in ("1", "true", "yes")
+sweep_pool_sizes = os.getenv("SWEEP_POOL_SIZES")
+sweep_fees = os.getenv("SWEEP_FEES")
+simulation_cache_dir = os.getenv("SIMULATION_CACHE_DIR", "simulation_cache")
+render_workers = int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 1)))
+block_data_store = os.getenv("BLOCK_DATA_STORE")
 
-os.makedirs("charts", exist_ok=True)
-
-# --- Load Data ---
-data = pd.read_csv("block_data.csv")
-payments = data["payment"].values
 blocks_per_validator_per_year = 2.5
 blocks_my_pool = validators_my_pool * blocks_per_validator_per_year
 pool_sizes = [1, 10, 100, 300, 500, 1000]
 
 # --- Helper Functions ---
-def simulate_pool_rewards(pool_size, payments, blocks_per_validator, n_simulations):
+def simulate_chunk(payments, total_blocks, n_simulations, job_seed):
+    # Draw whole (simulations x blocks) matrices at once, chunked so that no
+    # chunk holds more than max_draws_per_chunk sampled payments.
+    rng = np.random.default_rng(job_seed)
+    chunk_size = max(1, max_draws_per_chunk // max(total_blocks, 1))
+    rewards = np.empty(n_simulations)
+
+    for start in range(0, n_simulations, chunk_size):
+        stop = min(start + chunk_size, n_simulations)
+        draws = rng.integers(0, len(payments), size=(stop - start, total_blocks))
+        rewards[start:stop] = payments[draws].mean(axis=1)
+    return rewards
+
+def simulate_pool_rewards(pool_size, payments, blocks_per_validator, n_simulations, executor=None):
+    # Simulations are split into fixed-size jobs with their own spawned seed,
+    # so a given SEED gives the same results whatever the number of workers.
     total_blocks = int(pool_size * blocks_per_validator)
-    return np.array([
-        np.mean(np.random.choice(payments, total_blocks))
-        for _ in range(n_simulations)
-    ])
+    job_sizes = [min(simulations_per_job, n_simulations - start)
+                 for start in range(0, n_simulations, simulations_per_job)]
+    job_seeds = seed_sequence.spawn(len(job_sizes))
+    rewards = np.empty(n_simulations)
+
+    start_time = time.perf_counter()
+    if executor is None:
+        partials = map(simulate_chunk, [payments] * len(job_sizes),
+                       [total_blocks] * len(job_sizes), job_sizes, job_seeds)
+    else:
+        partials = executor.map(simulate_chunk, [payments] * len(job_sizes),
+                                [total_blocks] * len(job_sizes), job_sizes, job_seeds)
+    offset = 0
+    for partial in partials:
+        rewards[offset:offset + len(partial)] = partial
+        offset += len(partial)
+    elapsed = time.perf_counter() - start_time
+
+    draws_per_second = n_simulations * total_blocks / elapsed if elapsed else float("inf")
+    print(f"Simulated {n_simulations} x {total_blocks} blocks for {pool_size} validators "
+          f"in {elapsed:.2f}s ({draws_per_second / 1e6:.1f}M draws/s)")
+    return rewards
+
+def characteristic_function(payments, first, step, points):
+    # Empirical characteristic function E[exp(i t X)] of a single block payment
+    # on the grid t = first + k * step. Each term is advanced by a constant
+    # rotation, which is much cheaper than evaluating exp at every point.
+    term = np.exp(1j * first * payments)
+    rotation = np.exp(1j * step * payments)
+    values = np.empty(points, dtype=complex)
+    for k in range(points):
+        values[k] = term.mean()
+        term *= rotation
+    return values
+
+def inversion_grid(spread, max_frequency, width=20, min_points=1024):
+    # Midpoint grid over (0, width / spread] fine enough to follow the fastest
+    # oscillation of the characteristic function.
+    limit = width / spread
+    step = min(limit / min_points, (math.pi / 4) / max_frequency)
+    points = int(math.ceil(limit / step))
+    step = limit / points
+    return (np.arange(points) + 0.5) * step, step
+
+def mean_reward_cdf(payments, total_blocks, x):
+    # Gil-Pelaez inversion of the CDF of the mean of total_blocks payments.
+    spread = payments.std() / math.sqrt(total_blocks)
+    t, step = inversion_grid(spread, np.abs(payments).max() / total_blocks)
+    phi = characteristic_function(payments, t[0] / total_blocks, step / total_blocks, len(t)) ** total_blocks
+    cdf = 0.5 - np.sum((np.exp(-1j * np.outer(x, t)) * phi).imag / t, axis=1) * step / math.pi
+    return np.maximum.accumulate(np.clip(cdf, 0, 1))
+
+def bootstrap_means(payments, total_blocks):
+    return simulate_chunk(payments, total_blocks, bootstrap_samples, bootstrap_seed_sequence.spawn(1)[0])
+
+def analytic_probability(payments, pool_size, other_pool_size, blocks_per_validator, fee=1.0):
+    # P(mean reward of pool_size > fee * mean reward of other_pool_size), from
+    # the exact distribution of resampled block payments instead of sampling.
+    # Payments are far too skewed for a normal approximation, so the
+    # characteristic function of the difference is inverted directly. Pools
+    # under exact_min_blocks have a lumpy distribution that needs a very fine
+    # grid, so their mean is bootstrapped and compared against the exact CDF
+    # of the other pool.
+    mean, std = payments.mean(), payments.std()
+    max_payment = np.abs(payments).max()
+    blocks = int(pool_size * blocks_per_validator)
+    other_blocks = int(other_pool_size * blocks_per_validator)
+
+    if blocks >= exact_min_blocks and other_blocks >= exact_min_blocks:
+        spread = std * math.sqrt(1 / blocks + fee**2 / other_blocks)
+        t, step = inversion_grid(spread, max_payment * (1 / blocks + fee / other_blocks))
+        phi = (characteristic_function(payments, t[0] / blocks, step / blocks, len(t)) ** blocks
+               * characteristic_function(payments, -fee * t[0] / other_blocks, -fee * step / other_blocks,
+                                         len(t)) ** other_blocks)
+        return float(0.5 + np.sum(phi.imag / t) * step / math.pi)
+
+    if other_blocks >= exact_min_blocks:
+        other_spread = std / math.sqrt(other_blocks)
+        x = np.linspace(mean - 10 * other_spread, mean + 50 * other_spread, 1024)
+        cdf = mean_reward_cdf(payments, other_blocks, x)
+        means = bootstrap_means(payments, blocks)
+        return float(np.mean(np.interp(means / fee, x, cdf, left=0, right=1)))
+
+    if blocks >= exact_min_blocks:
+        spread = std / math.sqrt(blocks)
+        x = np.linspace(mean - 10 * spread, mean + 50 * spread, 1024)
+        cdf = mean_reward_cdf(payments, blocks, x)
+        other_means = bootstrap_means(payments, other_blocks)
+        return float(np.mean(1 - np.interp(fee * other_means, x, cdf, left=0, right=1)))
+
+    return float(np.mean(bootstrap_means(payments, blocks) > fee * bootstrap_means(payments, other_blocks)))
+
+def monte_carlo_error(probability, n_simulations):
+    # 95% confidence half-width of a Monte Carlo probability estimate.
+    return 1.96 * math.sqrt(probability * (1 - probability) / n_simulations)
 
 def plot_bar_chart(labels, values, title, ylabel, xlabel, filename, add_line=None):
     plt.figure(figsize=(10, 6))
@@ -88,104 +209,243 @@ def plot_cdf(results_dict, my_pool_mean, title, filename, label_suffix="", xlim=
     plt.savefig(f"charts/{filename}", dpi=300, bbox_inches='tight')
     plt.close()
 
-# --- Simulations ---
-rewards_my_pool = simulate_pool_rewards(validators_my_pool, payments, blocks_per_validator_per_year, n_simulations)
-results = {pool_size: simulate_pool_rewards(pool_size, payments, blocks_per_validator_per_year, n_simulations)
-           for pool_size in pool_sizes}
-
-probabilities = {pool_size: np.mean(rewards > rewards_my_pool) for pool_size, rewards in results.items()}
-
-# --- Plots (No Fee) ---
-plot_bar_chart(
-    labels=[str(p) for p in pool_sizes],
-    values=list(probabilities.values()),
-    title=f"Probability Other Pools Outperform {validators_my_pool}-Validator Pool",
-    ylabel="Probability",
-    xlabel="Pool Size (Validators)",
-    filename="probability_outperform_no_fee.png",
-    add_line=0.5
-)
-plot_kde(results, np.mean(rewards_my_pool), "Distribution of Average Reward per Block (Zoomed)",
-         "kde_rewards_per_block_no_fee.png")
-plot_cdf(results, np.mean(rewards_my_pool), "CDF of Average Reward per Block (Zoomed)",
-         "cdf_rewards_no_fee.png")
-
-# --- Apply Pool Fee ---
-rewards_my_pool_discounted = rewards_my_pool * pool_fee
-probabilities_discounted = {pool_size: np.mean(rewards > rewards_my_pool_discounted)
-                             for pool_size, rewards in results.items()}
-
-# --- Plots (With Fee) ---
-plot_bar_chart(
-    labels=[str(p) for p in pool_sizes],
-    values=list(probabilities_discounted.values()),
-    title=f"Probability Other Pools Outperform {validators_my_pool}-Validator Pool (Fee)",
-    ylabel="Probability",
-    xlabel="Pool Size (Validators)",
-    filename="probability_outperform_fee.png",
-    add_line=0.5
-)
-plot_kde(results, np.mean(rewards_my_pool_discounted),
-         "Distribution of Average Reward per Block with Fee (Zoomed)",
-         "kde_rewards_per_block_fee.png")
-plot_cdf(results, np.mean(rewards_my_pool_discounted),
-         "CDF of Average Reward per Block with Fee (Zoomed)",
-         "cdf_rewards_fee.png")
-
-# --- Smooth + Small Pool ---
-combined_results = {}
-for pool_size in pool_sizes:
-    total_validators = validators_my_pool + pool_size
-    combined_rewards = simulate_pool_rewards(total_validators, payments, blocks_per_validator_per_year, n_simulations)
-    combined_results[pool_size] = combined_rewards * pool_fee
-
-probabilities_combined = {pool_size: np.mean(results[pool_size] > combined_rewards)
-                           for pool_size, combined_rewards in combined_results.items()}
-
-# --- Plots (Smooth + Small Pool) ---
-plot_bar_chart(
-    labels=[str(p) for p in pool_sizes],
-    values=list(probabilities_combined.values()),
-    title=f"Probability Pool Beats (Smooth + Pool with Fee)",
-    ylabel="Probability",
-    xlabel="Pool Size (Validators)",
-    filename="probability_combined_smooth_plus_pool_fee.png",
-    add_line=0.5
-)
-plot_kde(combined_results, np.mean(rewards_my_pool_discounted),
-         "Distribution of Average Reward per Block (Smooth + Pool with Fee, Zoomed)",
-         "kde_combined_smooth_plus_pool_fee.png", label_suffix=" (Smooth + Fee)")
-plot_cdf(combined_results, np.mean(rewards_my_pool_discounted),
-         "CDF of Average Reward per Block (Smooth + Pool with Fee, Zoomed)",
-         "cdf_combined_smooth_plus_pool_fee.png", label_suffix=" (Smooth + Fee)")
-
-# --- Pie Chart: Rewards by Block Size ---
-high = payments[payments >= 1].sum()
-medium = payments[(payments >= 0.1) & (payments < 1)].sum()
-low = payments[payments < 0.1].sum()
-
-plt.figure(figsize=(8, 8))
-plt.pie(
-    [high, medium, low],
-    labels=['≥1 ETH', '0.1–1 ETH', '0–0.1 ETH'],
-    autopct='%1.1f%%',
-    startangle=140,
-    colors=['#FF6B6B', '#FFD93D', '#6BCB77'],
-    wedgeprops={'edgecolor': 'black'}
-)
-plt.title("Distribution of Total Rewards by Block Size", fontsize=16)
-plt.savefig("charts/pie_total_rewards_distribution.png", dpi=300, bbox_inches='tight')
-plt.close()
-
-# --- Final Results Printing ---
-print("\n--- Probabilities (No Fee) ---")
-for pool_size, prob in probabilities.items():
-    print(f"Pool with {pool_size} validators beats Smooth: {prob*100:.2f}% chance")
-
-print("\n--- Probabilities (With Fee) ---")
-for pool_size, prob in probabilities_discounted.items():
-    print(f"Pool with {pool_size} validators beats Smooth (with fee): {prob*100:.2f}% chance")
-
-print("\n--- Probabilities (Pool > Smooth+Pool with Fee) ---")
-for pool_size, prob in probabilities_combined.items():
-    print(f"Pool with {pool_size} validators beats Smooth+{pool_size} validators (with fee): {prob*100:.2f}% chance")
+def run_sweep(payments, executor=None):
+    # Each pool size is simulated once. A fee only scales rewards_my_pool, so
+    # every fee level reuses the same draws.
+    if sweep_pool_sizes:
+        sizes = [int(size) for size in sweep_pool_sizes.split(",")]
+    else:
+        sizes = np.unique(np.geomspace(1, 2000, 50).astype(int)).tolist()
+    if sweep_fees:
+        fees = [float(fee) for fee in sweep_fees.split(",")]
+    else:
+        fees = np.round(np.linspace(0.81, 1.0, 20), 2).tolist()
+
+    rewards_my_pool = simulate_pool_rewards(validators_my_pool, payments, blocks_per_validator_per_year,
+                                            n_simulations, executor)
+    rows = []
+    for pool_size in sizes:
+        rewards = simulate_pool_rewards(pool_size, payments, blocks_per_validator_per_year,
+                                        n_simulations, executor)
+        for fee in fees:
+            prob = np.mean(rewards > rewards_my_pool * fee)
+            rows.append({"pool_size": pool_size, "fee": fee, "probability": prob,
+                         "error": monte_carlo_error(prob, n_simulations)})
+
+    sweep_results = pd.DataFrame(rows)
+    sweep_results.to_csv("charts/sweep_probabilities.csv", index=False)
+
+    grid = sweep_results.pivot(index="pool_size", columns="fee", values="probability")
+    plt.figure(figsize=(14, 10))
+    sns.heatmap(grid.iloc[::-1], cmap="viridis", vmin=0, vmax=1,
+                cbar_kws={"label": "Probability"}, xticklabels=[f"{fee:.2f}" for fee in grid.columns])
+    plt.title(f"Probability Other Pools Outperform {validators_my_pool}-Validator Pool by Fee")
+    plt.xlabel("Pool Fee (share of rewards kept)")
+    plt.ylabel("Pool Size (Validators)")
+    plt.savefig("charts/sweep_probability_heatmap.png", dpi=300, bbox_inches='tight')
+    plt.close()
+
+    print(f"\nSwept {len(sizes)} pool sizes x {len(fees)} fees into charts/sweep_probabilities.csv "
+          f"and charts/sweep_probability_heatmap.png")
+
+def plot_pie(payments, filename):
+    high = payments[payments >= 1].sum()
+    medium = payments[(payments >= 0.1) & (payments < 1)].sum()
+    low = payments[payments < 0.1].sum()
+
+    plt.figure(figsize=(8, 8))
+    plt.pie(
+        [high, medium, low],
+        labels=['≥1 ETH', '0.1–1 ETH', '0–0.1 ETH'],
+        autopct='%1.1f%%',
+        startangle=140,
+        colors=['#FF6B6B', '#FFD93D', '#6BCB77'],
+        wedgeprops={'edgecolor': 'black'}
+    )
+    plt.title("Distribution of Total Rewards by Block Size", fontsize=16)
+    plt.savefig(f"charts/{filename}", dpi=300, bbox_inches='tight')
+    plt.close()
+
+def render_charts(charts):
+    # savefig at 300 dpi dominates once simulations are cached, so each chart
+    # is drawn in its own worker process.
+    if render_workers > 1:
+        with ProcessPoolExecutor(max_workers=render_workers) as render_pool:
+            futures = [render_pool.submit(plot, **kwargs) for plot, kwargs in charts]
+            for future in futures:
+                future.result()
+    else:
+        for plot, kwargs in charts:
+            plot(**kwargs)
+
+def load_payments():
+    # Only the payment column is used, so only that column is read
+    if block_data_store:
+        return block_store.load_columns(block_data_store, ["payment"]).column("payment").to_numpy()
+    return pd.read_csv("block_data.csv", usecols=["payment"])["payment"].values
+
+def simulation_cache_path(payments):
+    inputs = {
+        "payments_sha256": hashlib.sha256(payments.tobytes()).hexdigest(),
+        "pool_sizes": pool_sizes,
+        "validators_my_pool": validators_my_pool,
+        "blocks_per_validator": blocks_per_validator_per_year,
+        "n_simulations": n_simulations,
+        "simulations_per_job": simulations_per_job,
+        "seed": seed,
+    }
+    key = hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+    return os.path.join(simulation_cache_dir, f"simulations-{key[:16]}.npz")
+
+def run_simulations(payments, executor=None):
+    rewards_my_pool = simulate_pool_rewards(validators_my_pool, payments, blocks_per_validator_per_year,
+                                            n_simulations, executor)
+    results = np.array([simulate_pool_rewards(pool_size, payments, blocks_per_validator_per_year,
+                                              n_simulations, executor)
+                        for pool_size in pool_sizes])
+    combined_results = np.array([simulate_pool_rewards(validators_my_pool + pool_size, payments,
+                                                       blocks_per_validator_per_year, n_simulations, executor)
+                                 for pool_size in pool_sizes])
+    return rewards_my_pool, results, combined_results
+
+def load_simulations(payments, executor=None):
+    # Simulations are only reproducible, and so only cached, with a fixed SEED.
+    # Combined results are stored before the pool fee so POOL_FEE can change
+    # without invalidating the cache.
+    if not seed:
+        return run_simulations(payments, executor)
+
+    cache_path = simulation_cache_path(payments)
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            print(f"Loaded cached simulations from {cache_path}")
+            return cached["rewards_my_pool"], cached["results"], cached["combined_results"]
+
+    rewards_my_pool, results, combined_results = run_simulations(payments, executor)
+    os.makedirs(simulation_cache_dir, exist_ok=True)
+    with open(cache_path + ".tmp", "wb") as f:
+        np.savez(f, rewards_my_pool=rewards_my_pool, results=results, combined_results=combined_results)
+    os.replace(cache_path + ".tmp", cache_path)
+    return rewards_my_pool, results, combined_results
+
+def main():
+    os.makedirs("charts", exist_ok=True)
+
+    # --- Load Data ---
+    payments = load_payments()
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    if sweep:
+        run_sweep(payments, executor)
+        if executor is not None:
+            executor.shutdown()
+        return
+
+    # --- Simulations ---
+    rewards_my_pool, results_array, combined_array = load_simulations(payments, executor)
+    if executor is not None:
+        executor.shutdown()
+    results = dict(zip(pool_sizes, results_array))
+
+    probabilities = {pool_size: np.mean(rewards > rewards_my_pool) for pool_size, rewards in results.items()}
+
+    # --- Apply Pool Fee ---
+    rewards_my_pool_discounted = rewards_my_pool * pool_fee
+    probabilities_discounted = {pool_size: np.mean(rewards > rewards_my_pool_discounted)
+                                 for pool_size, rewards in results.items()}
+
+    # --- Smooth + Small Pool ---
+    combined_results = {pool_size: combined_rewards * pool_fee
+                        for pool_size, combined_rewards in zip(pool_sizes, combined_array)}
+
+    probabilities_combined = {pool_size: np.mean(results[pool_size] > combined_rewards)
+                               for pool_size, combined_rewards in combined_results.items()}
+
+    # --- Plots ---
+    charts = [
+        # No Fee
+        (plot_bar_chart, dict(
+            labels=[str(p) for p in pool_sizes],
+            values=list(probabilities.values()),
+            title=f"Probability Other Pools Outperform {validators_my_pool}-Validator Pool",
+            ylabel="Probability",
+            xlabel="Pool Size (Validators)",
+            filename="probability_outperform_no_fee.png",
+            add_line=0.5
+        )),
+        (plot_kde, dict(results_dict=results, my_pool_mean=np.mean(rewards_my_pool),
+                        title="Distribution of Average Reward per Block (Zoomed)",
+                        filename="kde_rewards_per_block_no_fee.png")),
+        (plot_cdf, dict(results_dict=results, my_pool_mean=np.mean(rewards_my_pool),
+                        title="CDF of Average Reward per Block (Zoomed)",
+                        filename="cdf_rewards_no_fee.png")),
+        # With Fee
+        (plot_bar_chart, dict(
+            labels=[str(p) for p in pool_sizes],
+            values=list(probabilities_discounted.values()),
+            title=f"Probability Other Pools Outperform {validators_my_pool}-Validator Pool (Fee)",
+            ylabel="Probability",
+            xlabel="Pool Size (Validators)",
+            filename="probability_outperform_fee.png",
+            add_line=0.5
+        )),
+        (plot_kde, dict(results_dict=results, my_pool_mean=np.mean(rewards_my_pool_discounted),
+                        title="Distribution of Average Reward per Block with Fee (Zoomed)",
+                        filename="kde_rewards_per_block_fee.png")),
+        (plot_cdf, dict(results_dict=results, my_pool_mean=np.mean(rewards_my_pool_discounted),
+                        title="CDF of Average Reward per Block with Fee (Zoomed)",
+                        filename="cdf_rewards_fee.png")),
+        # Smooth + Small Pool
+        (plot_bar_chart, dict(
+            labels=[str(p) for p in pool_sizes],
+            values=list(probabilities_combined.values()),
+            title=f"Probability Pool Beats (Smooth + Pool with Fee)",
+            ylabel="Probability",
+            xlabel="Pool Size (Validators)",
+            filename="probability_combined_smooth_plus_pool_fee.png",
+            add_line=0.5
+        )),
+        (plot_kde, dict(results_dict=combined_results, my_pool_mean=np.mean(rewards_my_pool_discounted),
+                        title="Distribution of Average Reward per Block (Smooth + Pool with Fee, Zoomed)",
+                        filename="kde_combined_smooth_plus_pool_fee.png", label_suffix=" (Smooth + Fee)")),
+        (plot_cdf, dict(results_dict=combined_results, my_pool_mean=np.mean(rewards_my_pool_discounted),
+                        title="CDF of Average Reward per Block (Smooth + Pool with Fee, Zoomed)",
+                        filename="cdf_combined_smooth_plus_pool_fee.png", label_suffix=" (Smooth + Fee)")),
+        # Pie Chart: Rewards by Block Size
+        (plot_pie, dict(payments=payments, filename="pie_total_rewards_distribution.png")),
+    ]
+    render_charts(charts)
+
+    # --- Analytic Estimates ---
+    analytic = {pool_size: analytic_probability(payments, pool_size, validators_my_pool,
+                                                blocks_per_validator_per_year)
+                for pool_size in pool_sizes}
+    analytic_discounted = {pool_size: analytic_probability(payments, pool_size, validators_my_pool,
+                                                           blocks_per_validator_per_year, pool_fee)
+                           for pool_size in pool_sizes}
+    analytic_combined = {pool_size: analytic_probability(payments, pool_size, validators_my_pool + pool_size,
+                                                         blocks_per_validator_per_year, pool_fee)
+                         for pool_size in pool_sizes}
+
+    # --- Final Results Printing ---
+    print("\n--- Probabilities (No Fee) ---")
+    for pool_size, prob in probabilities.items():
+        print(f"Pool with {pool_size} validators beats Smooth: {prob*100:.2f}% "
+              f"± {monte_carlo_error(prob, n_simulations)*100:.2f}% chance "
+              f"(analytic: {analytic[pool_size]*100:.2f}%)")
+
+    print("\n--- Probabilities (With Fee) ---")
+    for pool_size, prob in probabilities_discounted.items():
+        print(f"Pool with {pool_size} validators beats Smooth (with fee): {prob*100:.2f}% "
+              f"± {monte_carlo_error(prob, n_simulations)*100:.2f}% chance "
+              f"(analytic: {analytic_discounted[pool_size]*100:.2f}%)")
+
+    print("\n--- Probabilities (Pool > Smooth+Pool with Fee) ---")
+    for pool_size, prob in probabilities_combined.items():
+        print(f"Pool with {pool_size} validators beats Smooth+{pool_size} validators (with fee): {prob*100:.2f}% "
+              f"± {monte_carlo_error(prob, n_simulations)*100:.2f}% chance "
+              f"(analytic: {analytic_combined[pool_size]*100:.2f}%)")
+
+
+if __name__ == "__main__":
+    main()
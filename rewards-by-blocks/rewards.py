@@ -1,7 +1,18 @@
 import os
+import sys
+import argparse
 import csv
-import requests
+import heapq
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+import block_store
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from pooled_session import make_session
+from rate_limit import TokenBucket
 
 # Load environment variables from .env
 load_dotenv()
@@ -12,54 +23,252 @@ NUM_CALLS = int(os.getenv("NUM_CALLS", 10))  # default to 10 if not set
 # Default starting block if no file exists
 DEFAULT_START_BLOCK = int(os.getenv("START_BLOCK", 22347396))
 
+# Number of blocks fetched at the same time, and the maximum requests per second
+CONCURRENCY = int(os.getenv("CONCURRENCY", 8))
+RATE_LIMIT = float(os.getenv("RATE_LIMIT", 20))
+
+# payload.de API serving block_info
+API_URL = os.getenv("PAYLOAD_API_URL", "https://api.payload.de")
+
 # Output CSV filename
 OUTPUT_CSV = "block_data.csv"
+CSV_HEADER = ["payment", "slot", "block", "tx_count", "gas_used"]
 
-# Determine starting block
-if os.path.exists(OUTPUT_CSV):
-    with open(OUTPUT_CSV, mode='r', newline='') as csvfile:
-        reader = list(csv.reader(csvfile))
-        if len(reader) > 1:
-            last_row = reader[-1]
-            last_block = int(last_row[2])  # block is third column (index 2)
-            start_block = last_block - 1
+# Sorted set of the block numbers in OUTPUT_CSV, cached next to it
+INDEX_FILE = OUTPUT_CSV + ".index.json"
+
+# Optional Parquet copy of the data, partitioned by block range
+BLOCK_DATA_STORE = os.getenv("BLOCK_DATA_STORE")
+STORE_FLUSH_ROWS = 1000
+
+
+def read_last_row(path):
+    # Read backwards from the end of the file until the last full line is found,
+    # instead of loading the whole CSV.
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        tail = b""
+        while position > 0:
+            step = min(4096, position)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+            if len(tail.rstrip(b"\r\n").splitlines()) > 1:
+                break
+
+    lines = tail.rstrip(b"\r\n").splitlines()
+    if position == 0 and len(lines) <= 1:
+        return None  # empty file or header only
+    return next(csv.reader([lines[-1].decode()]))
+
+
+def to_ranges(blocks):
+    # Sorted block numbers as [first, last] runs, to keep the index file small
+    ranges = []
+    for block in blocks:
+        if ranges and block == ranges[-1][1] + 1:
+            ranges[-1][1] = block
         else:
-            start_block = DEFAULT_START_BLOCK
-else:
-    start_block = DEFAULT_START_BLOCK
-
-# Determine file mode (append if file exists, else write new)
-file_mode = 'a' if os.path.exists(OUTPUT_CSV) else 'w'
-
-# Open the CSV
-with open(OUTPUT_CSV, mode=file_mode, newline='') as csvfile:
-    writer = csv.writer(csvfile)
-    
-    # If new file, write headers
-    if file_mode == 'w':
-        writer.writerow(["payment", "slot", "block", "tx_count", "gas_used"])
-
-    # Loop over the number of calls
-    for i in range(NUM_CALLS):
-        block_number = start_block - i
-        url = f"https://api.payload.de/block_info?block={block_number}"
-
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            data = response.json()
-
-            # Extract required fields
-            payment = data.get("payment", 0)
-            slot = data.get("slot", 0)
-            block = data.get("block", 0)
-            tx_count = data.get("tx_count", 0)
-            gas_used = data.get("gas_used", 0)
-
-            # Write the row to CSV
-            writer.writerow([payment, slot, block, tx_count, gas_used])
+            ranges.append([block, block])
+    return ranges
+
+
+def load_block_index(csv_path, index_path):
+    """Return the sorted block numbers in csv_path.
+
+    The index remembers how many bytes of the CSV it covers and the last line
+    it read, so rows appended since are read from that offset instead of
+    parsing the whole file. It is rebuilt if the CSV no longer matches."""
+    blocks, offset = set(), 0
+    try:
+        with open(index_path) as f:
+            cached = json.load(f)
+        with open(csv_path, "rb") as f:
+            last_line = cached["last_line"].encode()
+            f.seek(max(0, cached["offset"] - len(last_line)))
+            if f.read(len(last_line)) == last_line:
+                offset = cached["offset"]
+                for first, last in cached["ranges"]:
+                    blocks.update(range(first, last + 1))
+    except (OSError, ValueError, KeyError):
+        pass
+
+    last_line = b""
+    with open(csv_path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # partially written row
+            if offset > 0:
+                blocks.add(int(next(csv.reader([line.decode()]))[2]))
+            offset += len(line)
+            last_line = line
+
+    blocks = sorted(blocks)
+    if last_line:
+        with open(index_path + ".tmp", "w") as f:
+            json.dump({"offset": offset, "last_line": last_line.decode(), "ranges": to_ranges(blocks)}, f)
+        os.replace(index_path + ".tmp", index_path)
+    return blocks
+
+
+def missing_blocks(blocks):
+    # Holes between the lowest and highest fetched block, highest first
+    present = set(blocks)
+    return [block for block in range(blocks[-1], blocks[0] - 1, -1) if block not in present]
+
+
+def merge_rows(csv_path, rows):
+    # Rewrite the CSV with the new rows merged in, keeping it sorted by block
+    # from highest to lowest.
+    rows = sorted(rows, key=lambda row: -int(row[2]))
+    with open(csv_path, newline='') as existing, open(csv_path + ".tmp", "w", newline='') as merged:
+        reader = csv.reader(existing)
+        writer = csv.writer(merged)
+        writer.writerow(next(reader))
+        writer.writerows(heapq.merge(reader, rows, key=lambda row: -int(row[2])))
+    os.replace(csv_path + ".tmp", csv_path)
+
+
+def fetch_block(session, bucket, block_number):
+    bucket.acquire()
+    url = f"{API_URL}/block_info?block={block_number}"
+    response = session.get(url, timeout=30)
+    response.raise_for_status()
+    data = response.json()
+
+    # Extract required fields
+    payment = data.get("payment", 0)
+    slot = data.get("slot", 0)
+    block = data.get("block", 0)
+    tx_count = data.get("tx_count", 0)
+    gas_used = data.get("gas_used", 0)
+    return [payment, slot, block, tx_count, gas_used]
 
+
+def fetch_blocks(block_numbers):
+    """Fetch blocks concurrently, yielding (block_number, row, error) in the
+    order of block_numbers so the CSV stays sorted."""
+    session = make_session(CONCURRENCY)
+    # burst=1 spaces requests evenly instead of sending a burst at startup
+    bucket = TokenBucket(RATE_LIMIT, burst=1)
+    pending = deque()
+    block_numbers = iter(block_numbers)
+
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+        for block_number in block_numbers:
+            pending.append((block_number, executor.submit(fetch_block, session, bucket, block_number)))
+            # Keep a bounded window in flight; results wait here until every
+            # earlier block has been yielded.
+            if len(pending) >= CONCURRENCY * 4:
+                yield result_of(*pending.popleft())
+        while pending:
+            yield result_of(*pending.popleft())
+
+
+def result_of(block_number, future):
+    try:
+        return block_number, future.result(), None
+    except Exception as e:
+        return block_number, None, e
+
+
+def backfill():
+    if not os.path.exists(OUTPUT_CSV):
+        print(f"{OUTPUT_CSV} does not exist, nothing to backfill")
+        return
+
+    blocks = load_block_index(OUTPUT_CSV, INDEX_FILE)
+    missing = missing_blocks(blocks) if blocks else []
+    if not missing:
+        print(f"No missing blocks in {OUTPUT_CSV}")
+        return
+    print(f"Found {len(missing)} missing blocks between {blocks[0]} and {blocks[-1]}")
+
+    rows = []
+    for block_number, row, error in fetch_blocks(missing):
+        if error is not None:
+            print(f"Error fetching block {block_number}: {error}")
+            continue
+        rows.append(row)
+        print(f"Fetched block {block_number}")
+
+    merge_rows(OUTPUT_CSV, rows)
+    load_block_index(OUTPUT_CSV, INDEX_FILE)
+    if BLOCK_DATA_STORE:
+        block_store.append_rows(BLOCK_DATA_STORE, rows)
+    print(f"Backfilled {len(rows)} of {len(missing)} missing blocks")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch block payments from payload.de into block_data.csv")
+    parser.add_argument("--backfill", action="store_true",
+                        help="fetch only the blocks missing between the lowest and highest saved block")
+    parser.add_argument("--build-store", action="store_true",
+                        help="copy every row of the CSV into BLOCK_DATA_STORE and exit")
+    args = parser.parse_args()
+    if BLOCK_DATA_STORE:
+        block_store.require_pyarrow()
+    if args.build_store:
+        if not BLOCK_DATA_STORE:
+            parser.error("--build-store needs BLOCK_DATA_STORE to be set")
+        block_store.import_csv(OUTPUT_CSV, BLOCK_DATA_STORE)
+        print(f"Copied {OUTPUT_CSV} into {BLOCK_DATA_STORE}")
+        return
+    if args.backfill:
+        backfill()
+        return
+
+    # Determine starting block
+    last_block = None
+    if os.path.exists(OUTPUT_CSV):
+        last_row = read_last_row(OUTPUT_CSV)
+        if last_row is not None:
+            last_block = int(last_row[2])  # block is third column (index 2)
+    start_block = last_block - 1 if last_block is not None else DEFAULT_START_BLOCK
+
+    # Determine file mode (append if file exists, else write new)
+    file_mode = 'a' if os.path.exists(OUTPUT_CSV) else 'w'
+
+    started = time.monotonic()
+    saved = 0
+    store_rows = []
+    # Open the CSV
+    with open(OUTPUT_CSV, mode=file_mode, newline='') as csvfile:
+        writer = csv.writer(csvfile)
+
+        # If new file, write headers
+        if file_mode == 'w':
+            writer.writerow(CSV_HEADER)
+
+        block_numbers = range(start_block, start_block - NUM_CALLS, -1)
+        for block_number, row, error in fetch_blocks(block_numbers):
+            if error is not None:
+                print(f"Error fetching block {block_number}: {error}")
+                continue
+            # Never write a block the file already ends with again
+            if last_block is not None and int(row[2]) >= last_block:
+                print(f"Skipping block {row[2]}, already saved")
+                continue
+
+            writer.writerow(row)
+            saved += 1
             print(f"Fetched and saved block {block_number}")
 
-        except Exception as e:
-            print(f"Error fetching block {block_number}: {e}")
+            if BLOCK_DATA_STORE:
+                store_rows.append(row)
+                if len(store_rows) >= STORE_FLUSH_ROWS:
+                    csvfile.flush()
+                    block_store.append_rows(BLOCK_DATA_STORE, store_rows)
+                    store_rows = []
+
+    if BLOCK_DATA_STORE:
+        block_store.append_rows(BLOCK_DATA_STORE, store_rows)
+
+    elapsed = time.monotonic() - started
+    print(f"Saved {saved} of {NUM_CALLS} blocks in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,17 @@
+import os
+import sys
 import requests
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import sp_api
+
 # Base URL for the beacon chain API
 BEACON_CHAIN_URL = "http://beacon-chain.prysm-holesky.dappnode:3500"
 
-# URL for fetching validators from the memory API
-MEMORY_VALIDATORS_URL = "https://sp-api.dappnode.io/memory/validators"
-
 def get_validators():
     try:
         # Fetching data from the memory validators endpoint
-        response = requests.get(MEMORY_VALIDATORS_URL)
-        response.raise_for_status()  # Check for HTTP errors
-
-        # Parse the response JSON
-        validators = response.json()
+        validators = sp_api.validators()
 
         # Extract all validator indices
         validator_indices = [validator['validator_index'] for validator in validators]
@@ -1,12 +1,16 @@
+import os
+import sys
 import requests
 import json
 
-def fetch_validators_data(url):
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        print("Failed to fetch data. Status code:", response.status_code)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import sp_api
+
+def fetch_validators_data():
+    try:
+        return sp_api.validators()
+    except requests.RequestException as e:
+        print("Failed to fetch data:", e)
         return []
 
 def wei_to_eth(wei_value):
@@ -23,8 +27,7 @@ def calculate_total_rewards(validators):
     return total_pending_rewards, total_accumulated_rewards
 
 def main():
-    url = "https://sp-api.dappnode.io/memory/validators"
-    validators = fetch_validators_data(url)
+    validators = fetch_validators_data()
     total_pending, total_accumulated = calculate_total_rewards(validators)
     
     total_pending_eth = wei_to_eth(total_pending)
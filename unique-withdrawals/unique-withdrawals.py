@@ -1,17 +1,19 @@
+import os
+import sys
 import requests
 import csv
 import json
 
-# URL to fetch data
-url = 'https://sp-api.dappnode.io/memory/validators'
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import sp_api
+
 csv_file_path = 'withdrawal_addresses_with_counts.csv'
 
-def fetch_data(url):
-    """Fetch data from a URL and return the JSON data."""
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
+def fetch_data():
+    """Fetch validators from the SP API and return the JSON data."""
+    try:
+        return sp_api.validators()
+    except requests.RequestException:
         return None
 
 def count_addresses(data):
@@ -37,8 +39,8 @@ def write_to_csv(address_counts, file_path):
             writer.writerow([address, count])
 
 def main():
-    # Fetch data from the URL
-    data = fetch_data(url)
+    # Fetch data from the SP API
+    data = fetch_data()
 
     if data is not None:
         # Count occurrences of each withdrawal address with active status
@@ -1,14 +1,19 @@
 import requests
 import os
+import sys
 from web3 import Web3
 from dotenv import load_dotenv
 import statistics
 import csv
 
-def fetch_rewards_data(api_url, slot_bounds, validator_indices, include_indices):
-    response = requests.get(api_url)
-    if response.status_code != 200:
-        raise ValueError("Failed to retrieve data from API")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import sp_api
+
+def fetch_rewards_data(slot_bounds, validator_indices, include_indices):
+    try:
+        data = sp_api.proposed_blocks()
+    except requests.RequestException as e:
+        raise ValueError("Failed to retrieve data from API") from e
     
     if include_indices:
         filter_condition = lambda x: int(x['validator_index']) not in validator_indices
@@ -21,7 +26,7 @@ def fetch_rewards_data(api_url, slot_bounds, validator_indices, include_indices)
             'validator_index': entry['validator_index'],
             'reward_eth': Web3.from_wei(int(entry['reward_wei']), 'ether')
         }
-        for entry in response.json()
+        for entry in data
         if slot_bounds[0] <= entry['slot'] < slot_bounds[1] and filter_condition(entry)
     ]
     print(f"Total blocks Proposed: {len(rewards)}")
@@ -50,12 +55,11 @@ def main():
     print("Reverse: ", os.getenv("REVERSE"))
     print("Validator Index: ", os.getenv("INDEX"))
 
-    api_url = "https://sp-api.dappnode.io/memory/proposedblocks"
     slot_bounds = (int(os.getenv("START_SLOT")), int(os.getenv("END_SLOT")))
     validator_indices = set(map(int, os.getenv("INDEX").split(',')))
     reverse = os.getenv("REVERSE", "False").lower() in ['true', '1', 't', 'y', 'yes']  # default is False
 
-    rewards = fetch_rewards_data(api_url, slot_bounds, validator_indices, reverse)
+    rewards = fetch_rewards_data(slot_bounds, validator_indices, reverse)
     if rewards:
         median_reward, average_reward = calculate_stats(rewards)
         print ("Validator Indices lenght: ", len(validator_indices))
@@ -1,15 +1,17 @@
+import os
+import sys
 import requests
 import json
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import sp_api
+
 # Endpoints
-VALIDATORS_ENDPOINT = "https://sp-api.dappnode.io/memory/validators"
 BEACON_CHAIN_ENDPOINT = "http://localhost:5052/eth/v1/beacon/states/finalized/validators"
 
 # Fetch validators data from the first API call
 def fetch_validators():
-    response = requests.get(VALIDATORS_ENDPOINT)
-    response.raise_for_status()  # Raise an error for bad responses
-    return response.json()
+    return sp_api.validators()  # Raises an error for bad responses
 
 # Call the second API with validator indices
 def fetch_validator_statuses(indices):
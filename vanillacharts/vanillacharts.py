@@ -1,16 +1,18 @@
-import requests
+import os
+import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 from datetime import datetime
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import sp_api
+
 # Constants
 SLOT_DURATION = 12  # seconds
 GENESIS_TIMESTAMP = 1606824023  # Slot 0 timestamp
 
 # Fetch data
-url = "https://sp-api.dappnode.io/memory/proposedblocks"
-response = requests.get(url)
-data = response.json()
+data = sp_api.proposed_blocks()
 
 # Load into DataFrame
 df = pd.DataFrame(data)
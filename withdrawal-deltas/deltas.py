@@ -1,12 +1,12 @@
-import requests
+import os
+import sys
 import csv
 from collections import defaultdict
 from decimal import Decimal, ROUND_DOWN
 
-# Function to fetch and parse data from the given endpoint
-def fetch_data(url):
-    response = requests.get(url)
-    return response.json()
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import sp_api
+
 
 # Function to convert wei to ETH and round to 4 decimals
 def wei_to_eth(wei_value):
@@ -14,11 +14,8 @@ def wei_to_eth(wei_value):
     return eth_value.quantize(Decimal('0.0001'), rounding=ROUND_DOWN)  # Round down to 4 decimals
 
 # Fetch data from the two endpoints
-proposed_blocks_url = "https://sp-api.dappnode.io/memory/proposedblocks"
-validators_url = "https://sp-api.dappnode.io/memory/validators"
-
-proposed_blocks = fetch_data(proposed_blocks_url)
-validators = fetch_data(validators_url)
+proposed_blocks = sp_api.proposed_blocks()
+validators = sp_api.validators()
 
 # Initialize dictionaries to store aggregated data by withdrawal address
 proposed_blocks_data = defaultdict(lambda: {'reward_sum': Decimal('0'), 'validator_count': 0})
@@ -1,16 +1,31 @@
-import requests
+import os
+import sys
 import json
 import time
 import logging
+import argparse
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import sp_api
+from rate_limit import TokenBucket
+
+# Last relay check result per validator key, kept between runs
+CACHE_FILE = "relay_check_cache.json"
+
+# Statuses the shared session retries for us; 429 is handled by fetch_relays
+RETRY_STATUSES = tuple(status for status in sp_api.RETRY_STATUSES if status != 429)
 
 logging.basicConfig(level=logging.INFO, filename="sp_api_logs.log", filemode="w", format="%(asctime)s - %(levelname)s - %(message)s")
 
 # Function to fetch data from API
-def fetch_data(url):
+def fetch_data(url, cache_ttl=sp_api.CACHE_TTL):
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
+        return sp_api.get_json(url, cache_ttl=cache_ttl)
     except Exception as e:
         logging.error(f"Error fetching data from {url}: {e}")
         return None
@@ -23,11 +38,89 @@ def save_to_json(data, filename):
     except Exception as e:
         logging.error(f"Error saving data to {filename}: {e}")
 
+# Per-key cache: {key: {"wrong_fee": bool, "checked_at": unix time}}
+def load_cache(filename):
+    try:
+        with open(filename) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        logging.error(f"Ignoring unreadable cache {filename}: {e}")
+        return {}
+
+def save_cache(cache, filename):
+    try:
+        with open(filename + ".tmp", 'w') as f:
+            json.dump(cache, f)
+        os.replace(filename + ".tmp", filename)
+    except Exception as e:
+        logging.error(f"Error saving data to {filename}: {e}")
+
+def needs_check(entry, now, cache_ttl):
+    # New, previously wrong and stale keys are checked again
+    return entry is None or entry["wrong_fee"] or now - entry["checked_at"] >= cache_ttl
+
+class AdaptivePacer:
+    """Adjusts a TokenBucket to the server: halves the rate when sp-api
+    answers 429, then creeps back up to max_rate while requests succeed.
+    A cut needs a throttled request sent after the previous cut, at least
+    cooldown seconds later, since requests sent at the old rate (or still
+    inside the server's rate window) say nothing about the new one."""
+
+    def __init__(self, bucket, max_rate, min_rate=0.1, cooldown=1.0):
+        self.bucket = bucket
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.cooldown = cooldown
+        self.rate = max_rate
+        self.last_cut = float("-inf")
+        self.lock = threading.Lock()
+
+    def record(self, throttled, started):
+        with self.lock:
+            if throttled:
+                if started < self.last_cut or time.monotonic() - self.last_cut < self.cooldown:
+                    return
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.last_cut = time.monotonic()
+            else:
+                self.rate = min(self.max_rate, self.rate + self.rate / 50)
+            self.bucket.set_rate(self.rate)
+
+# Function to fetch the registered relays of one validator key. 429s are
+# retried here rather than by the shared session, so that every attempt
+# waits for the token bucket and the pacer sees each throttled response.
+def fetch_relays(key, bucket, pacer, attempts=5):
+    path = f"/registeredrelays/{key}"
+    for attempt in range(attempts):
+        bucket.acquire()
+        started = time.monotonic()
+        try:
+            response = sp_api.get(path, retry_statuses=RETRY_STATUSES)
+            pacer.record(False, started)
+            return response.json()
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code != 429:
+                logging.error(f"Error fetching data from {path}: {e}")
+                return None
+            pacer.record(True, started)
+            # Back off with jitter so throttled workers do not retry in lockstep
+            try:
+                retry_after = float(e.response.headers.get("Retry-After", 0))
+            except ValueError:
+                retry_after = 0
+            time.sleep(max(retry_after, 2 ** attempt) * random.uniform(1, 1.5))
+        except Exception as e:
+            logging.error(f"Error fetching data from {path}: {e}")
+            return None
+    logging.error(f"Error fetching data from {path}: still rate limited after {attempts} attempts")
+    return None
+
 # Main function
-def main():
+def main(workers, rps, cache_ttl):
     # Step 1: Call and store result in a JSON file
-    validators_url = "https://sp-api.dappnode.io/memory/validators"
-    validators_data = fetch_data(validators_url)
+    validators_data = fetch_data("/memory/validators")
     if validators_data:
         save_to_json(validators_data, "validators.json")
         logging.info("Validators data saved to validators.json")
@@ -41,25 +134,58 @@ def main():
         if validator["status"] in ["yellowcard", "redcard", "active"]:
             validator_keys.add(validator["validator_key"])
 
-    # Step 3: Fetch registered relays for each validator key
-    wrong_fee_validators = set()
-    for key in validator_keys:
-        relay_url = f"https://sp-api.dappnode.io/registeredrelays/{key}"
-        relay_data = fetch_data(relay_url)
-        if relay_data:
-            if not relay_data.get("correct_fee_relayers"):
-                logging.warning(f"{key}: WRONG FEE RECIPIENT")
-                wrong_fee_validators.add(key)
+    # Step 3: Reuse cached results of keys checked OK within the cache TTL,
+    # dropping keys that are no longer subscribed
+    cache = {key: entry for key, entry in load_cache(CACHE_FILE).items() if key in validator_keys}
+    now = time.time()
+    keys_to_check = [key for key in validator_keys if needs_check(cache.get(key), now, cache_ttl)]
+    print(f"{len(validator_keys) - len(keys_to_check)} keys cached, checking {len(keys_to_check)} "
+          f"new, previously wrong or stale keys")
+
+    # Step 4: Fetch registered relays for each key to check, paced by a
+    # shared token bucket that slows down when sp-api answers 429
+    failed = 0
+    bucket = TokenBucket(rps, burst=1)
+    pacer = AdaptivePacer(bucket, rps)
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetch_relays, key, bucket, pacer): key for key in keys_to_check}
+        for done, future in enumerate(as_completed(futures), 1):
+            key = futures[future]
+            relay_data = future.result()
+            if relay_data:
+                wrong_fee = not relay_data.get("correct_fee_relayers")
+                if wrong_fee:
+                    logging.warning(f"{key}: WRONG FEE RECIPIENT")
+                else:
+                    logging.info(f"{key}: OK")
+                cache[key] = {"wrong_fee": wrong_fee, "checked_at": time.time()}
             else:
-                logging.info(f"{key}: OK")
-        else:
-            logging.error(f"Failed to fetch relay data for {key}")
+                # A previously wrong key keeps its cached result
+                failed += 1
+                logging.error(f"Failed to fetch relay data for {key}")
+
+            if done % 20 == 0 or done == len(futures):
+                elapsed = time.monotonic() - started
+                wrong = sum(1 for key in keys_to_check if key in cache and cache[key]["wrong_fee"])
+                print(f"Checked {done}/{len(futures)} keys in {elapsed:.0f}s: "
+                      f"{wrong} wrong, {failed} failed, pacing {pacer.rate:.2f} req/s")
+                save_cache(cache, CACHE_FILE)
+    save_cache(cache, CACHE_FILE)
 
-        time.sleep(3)  # Wait for 3 seconds between requests
+    wrong_fee_validators = {key for key, entry in cache.items() if entry["wrong_fee"]}
 
-    # Step 4: Save wrong fee validators to JSON file
-    save_to_json(list(wrong_fee_validators), "wrong_fee_validators.json")
+    # Step 5: Save wrong fee validators to JSON file
+    save_to_json(sorted(wrong_fee_validators), "wrong_fee_validators.json")
     logging.info("Wrong fee validators saved to wrong_fee_validators.json")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Find Smooth validators without a relay using Smooth's fee recipient.")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent /registeredrelays requests (default 4)")
+    parser.add_argument("--rps", type=float, default=2, help="maximum /registeredrelays requests per second (default 2)")
+    parser.add_argument("--cache-ttl", type=float, default=24,
+                        help="hours a key checked OK is not checked again, 0 rechecks every key (default 24)")
+    args = parser.parse_args()
+    if args.workers < 1 or args.rps <= 0:
+        parser.error("--workers must be at least 1 and --rps greater than 0")
+    main(args.workers, args.rps, args.cache_ttl * 3600)